@@ -23,7 +23,7 @@ from colorama import Fore, init
 
 from Solution import Solution
 from ImgTrans import ReceiveImg, ReceiveImgTCP, ReceiveImgUDP
-from utils import Cap
+from utils import Cap, ReplayCap, LensCalibration, GroundPlane
 
 # 初始化 colorama
 init(autoreset=True)
@@ -41,7 +41,7 @@ class Ad_Config(Solution):
 
     def __init__(
         self,
-        _cap: cv2.VideoCapture | Cap | ReceiveImg,
+        _cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg,
         ser_port: str|None = None,
     ):
         super().__init__(ser_port, "config.yaml")
@@ -108,6 +108,8 @@ class Ad_Config(Solution):
             if img is None:
                 continue
 
+            # 阈值在光照归一化之后的图像上调节，与识别时一致
+            img = self.traditional_color_detector.normalize(img)
             new_img = img.copy()
 
             binarization_img = self.traditional_color_detector.binarization(img)
@@ -208,7 +210,7 @@ class Ad_Area_config:
     area_dict: dict[int, list[tuple[int, int]]]
     x:int
 
-    def __init__(self, _cap: cv2.VideoCapture | Cap | ReceiveImg) -> None:
+    def __init__(self, _cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg) -> None:
         self.load_config()
         self.x = 0
 
@@ -290,31 +292,218 @@ class Ad_Area_config:
         cv2.destroyAllWindows()
 
 
-def ad_color(_cap: cv2.VideoCapture | Cap | ReceiveImg):
+class Ad_Calibration:
+    """
+    标定镜头畸变
+    ----
+    * 从不同角度拍摄棋盘格，按c采集当前帧
+    * 按k计算标定参数，按u切换显示校正之后的画面
+    * 按s保存标定参数，映射表会在识别程序第一次加载时计算并缓存
+
+    需要使用完整画面标定，不能裁剪
+    """
+
+    def __init__(
+        self,
+        _cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg,
+        pattern: tuple[int, int] = (9, 6),
+        square: float = 1.0
+    ) -> None:
+        """
+        初始化
+        ----
+        Args:
+            pattern (tuple): 棋盘格内角点数 (列, 行)
+            square (float): 棋盘格边长
+        """
+        self.cap = _cap
+        self.pattern = pattern
+        self.square = square
+        self.images: list[cv2.typing.MatLike] = []
+        self.result: tuple | None = None
+        self.lens: LensCalibration | None = None
+
+    def save_config(self):
+        """
+        保存配置
+        """
+        if self.result is None:
+            print(Fore.RED + "还没有标定")
+            return
+        camera_matrix, dist_coeffs, _ = self.result
+        h, w = self.images[0].shape[:2]
+        with open("config.yaml", "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        config["calibration"] = {
+            "camera_matrix": np.round(camera_matrix, 6).tolist(),
+            "dist_coeffs": np.round(dist_coeffs, 8).tolist(),
+            "image_size": [w, h],
+            "alpha": (config.get("calibration") or {}).get("alpha", 0),
+        }
+        with open("config.yaml", "w", encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False)
+
+    def main(self):
+        cv2.namedWindow("img", cv2.WINDOW_AUTOSIZE)
+        show_undistort = False
+
+        while True:
+            _, img = self.cap.read()
+            if img is None:
+                continue
+            show = img.copy()
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            found, corners = cv2.findChessboardCorners(gray, self.pattern, None)
+            if found:
+                cv2.drawChessboardCorners(show, self.pattern, corners, found)
+            if show_undistort and self.lens is not None:
+                show = self.lens.remap_frame(img)
+            cv2.putText(show, f"images:{len(self.images)}", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            cv2.imshow("img", show)
+
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord("q"):
+                break
+            elif key == ord("c") and found:
+                self.images.append(img.copy())
+            elif key == ord("k"):
+                self.result = LensCalibration.calibrate_chessboard(self.images, self.pattern, self.square)
+                if self.result is None:
+                    print(Fore.RED + "有效的棋盘格图像不足3张")
+                    continue
+                h, w = img.shape[:2]
+                self.lens = LensCalibration(self.result[0], self.result[1], (w, h), cache_dir="/tmp")
+                print(Fore.GREEN + f"标定完成，重投影误差 {self.result[2]:.3f}")
+            elif key == ord("u"):
+                show_undistort = not show_undistort
+            elif key == ord("s"):
+                self.save_config()
+                print(Fore.GREEN + "保存配置")
+        cv2.destroyAllWindows()
+
+
+class Ad_GroundPlane:
+    """
+    标定地面坐标
+    ----
+    * 在地面上放置至少4个已知坐标的参考点
+    * 鼠标左键点击参考点，之后在终端输入它的地面坐标(mm)，鼠标右键删除最后一个点
+    * 按s计算单应性并保存，按q退出
+
+    参考点的像素坐标是完整画面中的坐标，标定过镜头时识别程序会先做畸变校正
+    """
+
+    def __init__(self, _cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg) -> None:
+        self.cap = _cap
+        self.pixel_points: list[list[int]] = []
+        self.world_points: list[list[float]] = []
+        self._pending: tuple[int, int] | None = None
+
+    def __mouse_callback(self, event, x, y, flags, param):
+        if event == cv2.EVENT_LBUTTONDOWN:
+            self._pending = (x, y)
+        elif event == cv2.EVENT_RBUTTONDOWN and self.pixel_points:
+            self.pixel_points.pop()
+            self.world_points.pop()
+
+    def save_config(self, image_size: tuple[int, int]):
+        """
+        保存配置
+        """
+        with open("config.yaml", "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        lens = LensCalibration.from_config(config.get("calibration"), "/tmp")
+        try:
+            ground = GroundPlane(self.pixel_points, self.world_points, image_size, lens, "/tmp")
+        except ValueError as e:
+            print(Fore.RED + str(e))
+            return
+        # 检查参考点的重投影误差
+        err = np.abs(ground.to_world_points(self.pixel_points) - np.array(self.world_points)).max()
+        print(Fore.GREEN + f"参考点最大误差 {err:.1f}mm")
+
+        config["ground_plane"] = {
+            "pixel_points": self.pixel_points,
+            "world_points": self.world_points,
+            "image_size": list(image_size),
+        }
+        with open("config.yaml", "w", encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False)
+        print(Fore.GREEN + "保存配置")
+
+    def main(self):
+        cv2.namedWindow("img", cv2.WINDOW_AUTOSIZE)
+        cv2.setMouseCallback("img", self.__mouse_callback)
+        image_size = (320, 240)
+
+        while True:
+            _, img = self.cap.read()
+            if img is None:
+                continue
+            image_size = (img.shape[1], img.shape[0])
+            for (x, y), (X, Y) in zip(self.pixel_points, self.world_points):
+                cv2.circle(img, (x, y), 4, (0, 0, 255), -1)
+                cv2.putText(img, f"{X:g},{Y:g}", (x + 5, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
+            cv2.imshow("img", img)
+            key = cv2.waitKey(1) & 0xFF
+
+            if self._pending is not None:
+                x, y = self._pending
+                self._pending = None
+                text = input(f"像素({x}, {y})的地面坐标 X,Y(mm): ")
+                try:
+                    X, Y = (float(v) for v in text.replace("，", ",").split(","))
+                except ValueError:
+                    print(Fore.RED + "格式错误，示例: 100,250")
+                    continue
+                self.pixel_points.append([x, y])
+                self.world_points.append([X, Y])
+
+            if key == ord("q"):
+                break
+            elif key == ord("s"):
+                self.save_config(image_size)
+        cv2.destroyAllWindows()
+
+
+def ad_color(_cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg):
     ad_config = Ad_Config(_cap)
     ad_config.adjust_color_threshold()
 
-def ad_circle(_cap: cv2.VideoCapture | Cap | ReceiveImg):
+def ad_circle(_cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg):
     ad_config = Ad_Config(_cap)
     ad_config.adjust_circle()
 
-def ad_area(_cap: cv2.VideoCapture | Cap | ReceiveImg):
+def ad_area(_cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg):
     ad_area_config = Ad_Area_config(_cap)
     ad_area_config.main()
 
-def ad_right_angle(_cap: cv2.VideoCapture | Cap | ReceiveImg):
+def ad_right_angle(_cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg):
     ad_line_config = Ad_Config(_cap)
     ad_line_config.adjust_rightAngle()
 
+def ad_calibration(_cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg):
+    ad_calibration_config = Ad_Calibration(_cap)
+    ad_calibration_config.main()
+
+def ad_ground_plane(_cap: cv2.VideoCapture | Cap | ReplayCap | ReceiveImg):
+    ad_ground_config = Ad_GroundPlane(_cap)
+    ad_ground_config.main()
+
 
 if __name__ == "__main__":
     # 机载摄像头
     # cap = Cap(0)
 
+    # 回放录像
+    # cap = ReplayCap("record.avi", pacing="realtime", loop=True)
+
     # 图传接收器
     cap = ReceiveImgUDP("169.254.133.100", 4444, "169.254.233.52")
 
     #  先s保存，再q退出
+    # ad_calibration(cap)
+    # ad_ground_plane(cap)
     ad_color(cap)
     ad_area(cap)
     ad_circle(cap)
@@ -27,6 +27,8 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import json
 import math
+import os
+import time
 
 import cv2
 import numpy as np
@@ -34,7 +36,7 @@ import yaml
 from colorama import Fore, init
 
 import detector
-from utils import printLog, ConfigLoader, Uart
+from utils import printLog, ConfigLoader, Uart, Trace, TraceRecorder, traced, LensCalibration, GroundPlane
 
 # 初始化 colorama
 init(autoreset=True)
@@ -100,6 +102,9 @@ class Solution(ConfigLoader):
         self.traditional_color_detector = detector.TraditionalColorDetector()
         self.line_detector = detector.LineDetector()
         self.uart = Uart(ser_port)
+        # 当前帧的延迟追踪，和最近若干帧的延迟统计
+        self.trace:Trace|None = None
+        self.trace_recorder = TraceRecorder()
         self.configPath = config_path
         self.position_id_stack:list[dict[str,int|None]] = []     # 用于存放上一帧图像的物料位号的栈
 
@@ -109,6 +114,40 @@ class Solution(ConfigLoader):
         self.area3_points:list[list[int]] = [[0,0],[0,0]]
         self.target_angle:int = 45
         self.NEED2CUT:int = 40
+        self.PROCESS_EVERY:int = 1
+        # 采集配置，{配置名: {"width", "height", "fps", "crop"}}，raw模式的采集源还可以写"decode"解码模式
+        self.capture_profiles:dict[str, dict] = {}
+        # 任务使用的采集配置，{任务编号: 配置名}
+        self.task_profiles:dict[str, str] = {}
+        # 输入图像坐标到采集画面坐标的变换 (x0, y0, scale)，由采集配置的裁剪和缩小决定
+        self.frame_transform:tuple[int, int, int] = (0, 0, 1)
+        # 镜头标定参数，没有标定时为None，输出的坐标不做畸变校正
+        self.calibration:dict|None = None
+        self.lens:LensCalibration|None = None
+        # 地面标定参数，没有标定时为None
+        self.ground_plane:dict|None = None
+        self.ground:GroundPlane|None = None
+        # 发给电控的坐标，pixel为像素坐标，world为地面坐标(mm)
+        self.coord_output:str = "pixel"
+        # 物料识别只处理位号区域的外接矩形，外扩material_roi_margin像素
+        self.material_roi:bool = False
+        self.material_roi_margin:int = 20
+        # 金字塔层数，大于0时先在缩小的图像上找候选，再在原图的小窗口中精确定位，0为不使用
+        self.pyramid_levels:int = 0
+        self.pyramid_color_detector:detector.PyramidColorDetector|None = None
+        self.pyramid_circle_detector:detector.PyramidCircleDetector|None = None
+        # 物料运动检测先用积分图判断位号占用，结果不明确时才提取轮廓
+        self.material_fast_path:bool = False
+        self.slot_occupancy:detector.SlotOccupancy|None = None
+        # 物料检测方式，color为每帧整幅图颜色识别，background为背景建模只在前景附近识别
+        self.material_detector:str = "color"
+        self.background_detector:detector.BackgroundMaterialDetector|None = None
+        # 物料跟踪，只在预测位置附近的窗口中识别，跟丢之后才整幅图识别
+        self.material_tracking:bool = False
+        self.material_tracker:detector.MaterialTracker|None = None
+        # 转盘运动预测的参数，centre为null时根据物料位置拟合转动中心
+        self.turntable:dict|None = None
+        self.turntable_predictor = detector.TurntablePredictor()
         self.clientsIp_debug = []
         self.clientsIp_main = []
         # 读取配置文件
@@ -137,6 +176,19 @@ class Solution(ConfigLoader):
             self.load_param(config, "area3_points"),
             self.load_param(config, "target_angle", ),
             self.load_param(config, "need2cut_height", "NEED2CUT"),
+            self.load_param(config, "process_every", "PROCESS_EVERY"),
+            self.load_param(config, "capture_profiles"),
+            self.load_param(config, "task_profiles"),
+            self.load_param(config, "calibration"),
+            self.load_param(config, "ground_plane"),
+            self.load_param(config, "coord_output"),
+            self.load_param(config, "material_roi"),
+            self.load_param(config, "material_roi_margin"),
+            self.load_param(config, "pyramid_levels"),
+            self.load_param(config, "material_fast_path"),
+            self.load_param(config, "material_detector"),
+            self.load_param(config, "material_tracking"),
+            self.load_param(config, "turntable"),
             self.load_param(config, "clientsIp_debug"),
             self.load_param(config, "clientsIp_main"),
         ]
@@ -146,14 +198,149 @@ class Solution(ConfigLoader):
         load_err2 = self.line_detector.load_config(self.configPath)
         # 加载颜色识别的参数
         load_err3 = self.traditional_color_detector.load_config(self.configPath)
+        if self.pyramid_levels > 0:
+            self.pyramid_color_detector = detector.PyramidColorDetector(self.traditional_color_detector, self.pyramid_levels)
+            self.pyramid_circle_detector = detector.PyramidCircleDetector(self.annulus_circle_detector, self.pyramid_levels)
+        else:
+            self.pyramid_color_detector = None
+            self.pyramid_circle_detector = None
+        self.slot_occupancy = detector.SlotOccupancy() if self.material_fast_path else None
+        if self.material_detector == "background":
+            self.background_detector = detector.BackgroundMaterialDetector(
+                self.traditional_color_detector, self.pyramid_color_detector
+            )
+            err.append(self.background_detector.load_config(self.configPath))
+        else:
+            self.background_detector = None
+        if self.material_tracking:
+            self.material_tracker = detector.MaterialTracker(
+                self.traditional_color_detector, self.background_detector or self.pyramid_color_detector
+            )
+        else:
+            self.material_tracker = None
+        self.turntable_predictor = detector.TurntablePredictor.from_config(self.turntable)
 
         err.extend([load_err1, load_err2, load_err3])
+
+        # 畸变校正和地面坐标的查找表缓存在配置文件旁边，这里先加载，避免第一次识别时才计算
+        cache_dir = os.path.dirname(os.path.abspath(self.configPath))
+        self.lens = LensCalibration.from_config(self.calibration, cache_dir)
+        if self.lens is not None:
+            self.lens.preload()
+        try:
+            self.ground = GroundPlane.from_config(self.ground_plane, self.lens, cache_dir)
+        except ValueError as e:
+            self.ground = None
+            printLog(Fore.RED + str(e))
+        if self.ground is not None:
+            self.ground.build_lut()
+        elif self.coord_output == "world":
+            printLog(Fore.RED + "没有地面标定，输出像素坐标")
         if any(err):
             for e in err:
                 if e:
                     printLog(Fore.RED + e)
 
+    def attach_trace(self, trace:Trace|None):
+        """
+        设置当前帧的延迟追踪
+        ----
+        识别和串口发送会在追踪上记录时间点，串口发送结果之后追踪结束并计入 `trace_recorder`
+
+        Args:
+            trace (Trace): 读取帧时得到的追踪，None时不追踪
+        """
+        if trace is not None and trace.recorder is None:
+            trace.recorder = self.trace_recorder
+        self.trace = trace
+        self.uart.trace = trace
+
+    def task_profile(self, sign: str | None) -> dict | None:
+        """
+        获取任务对应的采集配置
+        ----
+        没有单独配置的任务使用default
+
+        Args:
+            sign (str): 任务编号
+        Returns:
+            dict|None: 采集配置，没有default配置时返回None
+        """
+        name = self.task_profiles.get(str(sign), "default") if sign is not None else "default"
+        return self.capture_profiles.get(name)
+
+    def to_frame_point(self, point:tuple[int,int]) -> tuple[int,int]:
+        """
+        将输入图像中的坐标换算到采集画面中
+        ----
+        发给电控的坐标和位号的区域都使用采集画面的坐标
+
+        Args:
+            point (tuple): 输入图像中的坐标
+        Returns:
+            tuple: 采集画面中的坐标
+        """
+        x0, y0, scale = self.frame_transform
+        return point[0] * scale + x0, point[1] * scale + y0
+
+    def output_point(self, point:tuple[int,int]) -> tuple[int,int]:
+        """
+        计算发给电控的坐标
+        ----
+        换算到采集画面中，标定过镜头时再查表做畸变校正；
+        coord_output为world时查表换算到地面坐标(mm)。
+        结果都取整并限制在0~999，保证串口协议中的3位数字
+
+        Args:
+            point (tuple): 输入图像中的坐标
+        Returns:
+            tuple: 发给电控的坐标
+        """
+        point = self.to_frame_point(point)
+        if self.coord_output == "world" and self.ground is not None:
+            point = self.ground.to_world(point)
+            if not (0 <= point[0] <= 999 and 0 <= point[1] <= 999):
+                printLog(Fore.YELLOW + f"地面坐标({point[0]:.0f}, {point[1]:.0f})超出0~999，发送的坐标限制在边界" + Fore.RESET)
+        elif self.lens is not None:
+            # 画面边缘的点校正之后可能为负数或者超出画面
+            point = self.lens.undistort_point(point)
+        return min(max(round(point[0]), 0), 999), min(max(round(point[1]), 0), 999)
+
+    def from_frame_point(self, point) -> tuple[int,int]:
+        """
+        将采集画面中的坐标换算到输入图像中
+        ----
+        Args:
+            point (tuple): 采集画面中的坐标
+        Returns:
+            tuple: 输入图像中的坐标
+        """
+        x0, y0, scale = self.frame_transform
+        return (point[0] - x0) // scale, (point[1] - y0) // scale
+
+    def reset_material_tracking(self):
+        """
+        清空上一次的物料位号和物料跟踪的状态
+        ----
+        开始新一轮物料运动检测时调用
+        """
+        self.position_id_stack = []
+        if self.material_tracker is not None:
+            self.material_tracker.reset()
+        self.turntable_predictor.reset()
+
+    def frame_time(self) -> float:
+        """
+        当前帧的时间
+        ----
+        有延迟追踪时使用摄像头取到帧的时间，否则使用当前时间
+        """
+        if self.trace is not None and "grab" in self.trace.stamps:
+            return self.trace.stamps["grab"]
+        return time.perf_counter()
+
     # region 物料运动检测
+    @traced
     def material_moving_detect(self, _img:cv2.typing.MatLike) -> tuple[str|None, cv2.typing.MatLike]:
         """
         物料运动检测
@@ -173,13 +360,19 @@ class Solution(ConfigLoader):
         """
         res_img = _img.copy()
 
-        color_position_dict:dict[str,tuple[int,int,int,int]] = self.__detect_material_positions(_img)   # type:ignore
+        occupancy, masks = self.__slot_occupancy(_img) if self.slot_occupancy is not None else (None, None)
+        if occupancy is None:
+            # 快速判断的结果不明确，逐个提取轮廓，二值化图像直接复用
+            color_position_dict:dict[str,tuple[int,int,int,int]] = self.__detect_material_positions(_img, masks)   # type:ignore
+            # 将坐标转换成位号，在后面排除了now_color_position_id_dict中有None的情况
+            now_color_position_id_dict = self.position2area(color_position_dict)     # type:ignore
+        else:
+            now_color_position_id_dict = {color: None if item is None else item[0] for color, item in occupancy.items()}
+            # 快速判断不提取轮廓，只画出位号
+            color_position_dict = {color: None for color in COLOR_DIC.values()}  # type:ignore
 
         res_img = self.__draw_positions(color_position_dict, res_img)
 
-        # 将坐标转换成位号，在后面排除了now_color_position_id_dict中有None的情况
-        now_color_position_id_dict: dict[str, int|None] = self.position2area(color_position_dict)     # type:ignore
-
         # 上一次的颜色位号
         last_color_position_id_dict: dict[str, int] = (
             self.position_id_stack.pop()
@@ -201,6 +394,7 @@ class Solution(ConfigLoader):
     # endregion
 
     # region 物料位置检测
+    @traced
     def get_material(self, _img:cv2.typing.MatLike) -> tuple[str|None, cv2.typing.MatLike]:
         """
         获取物料位置，返回字符发送电控
@@ -229,6 +423,41 @@ class Solution(ConfigLoader):
         res = "C" + res + "E"
         return res, res_img
 
+    # region 物料到达预测
+    @traced
+    def material_arrival(self, _img:cv2.typing.MatLike) -> tuple[str|None, cv2.typing.MatLike]:
+        """
+        预测每个物料到达每个位号的时间，返回字符发送电控
+        ----
+        Args:
+            _img (np.ndarray): 图片
+        Returns:
+            res (str,cv2.Mat): 预测结果和画出物料和位号的图片
+
+            例如："P" + 红色到1、2、3号位的时间 + 绿色... + 蓝色... + "E"，
+            每个时间为4位毫秒数，物料已经在位号中为0000，超过9999ms为9999，无法预测为FFFF
+        """
+        res_img = _img.copy()
+
+        color_position_dict = self.__detect_material_positions(_img)
+        res_img = self.__draw_positions(color_position_dict, res_img)
+        color_position_id_dict = self.position2area(color_position_dict)
+
+        now = self.frame_time()
+        areas = (self.area1_points, self.area2_points, self.area3_points)
+        res = "P"
+        for color in COLOR_DIC.values():
+            for area_id, area in enumerate(areas, start=1):
+                if color_position_id_dict.get(color) == area_id:
+                    res += "0000"
+                    continue
+                centre = ((area[0][0] + area[1][0]) / 2, (area[0][1] + area[1][1]) / 2)
+                t = self.turntable_predictor.time_to(color, centre, now)
+                res += "FFFF" if t is None else f"{min(int(t * 1000), 9999):04d}"
+        res += "E"
+        return res, res_img
+    # endregion
+
     def __draw_positions(self, color_position_dict, _img):
         for (color, position), area_point in zip(
                 color_position_dict.items(),
@@ -240,14 +469,18 @@ class Solution(ConfigLoader):
             # 画出位号
             cv2.rectangle(
                 _img,
-                (area_point[0][0], area_point[0][1]),
-                (area_point[1][0], area_point[1][1]),
+                self.from_frame_point(area_point[0]),
+                self.from_frame_point(area_point[1]),
                 (255, 0, 200),
                 2,
             )
         return _img
 
-    def __detect_material_positions(self, _img:cv2.typing.MatLike) -> dict[str, tuple[int, int, int, int] | None]:
+    def __detect_material_positions(
+        self,
+        _img:cv2.typing.MatLike,
+        masks:dict[str, cv2.typing.MatLike]|None = None
+    ) -> dict[str, tuple[int, int, int, int] | None]:
         """
         物料位置检测(跟踪)
         ----
@@ -255,6 +488,8 @@ class Solution(ConfigLoader):
 
         Args:
             _img (np.ndarray): 图片
+            masks (dict): 已经算好的识别区域内的二值化图像，只在逐个提取轮廓时复用，
+                使用金字塔、背景建模或跟踪检测时忽略
         Returns:
             res_dict (dict): 结果字典，例如：{"R":(x,y,w,h), "G":(x,y,w,h), "B":(x,y,w,h)}
         """
@@ -264,18 +499,121 @@ class Solution(ConfigLoader):
             color: None for color in COLOR_DIC.values()
         }
 
-        img = _img.copy()
-        img_sharpen = self.annulus_circle_detector.sharpen(img)  # 锐化
-
-        for color in COLOR_DIC.values():
-            self.traditional_color_detector.update_threshold(color)
-            binarization_img=self.traditional_color_detector.binarization(img_sharpen)
-            res = self.traditional_color_detector.get_color_position(binarization_img)
-            if res is not None:
-                res_dict[color] = res
+        # 只处理位号区域，结果再平移回原图坐标
+        x0, y0, x1, y1 = self.material_roi_rect(_img.shape) if self.material_roi else (0, 0, _img.shape[1], _img.shape[0])
+        if x1 <= x0 or y1 <= y0:
+            return res_dict
+
+        position_detector = self.material_tracker or self.background_detector or self.pyramid_color_detector
+        if position_detector is not None:
+            # 光照归一化之后再识别颜色
+            _img = self.traditional_color_detector.normalize(_img, "material")
+            res = position_detector.detect(
+                _img[y0:y1, x0:x1], tuple(COLOR_DIC.values()), prefilter=self.annulus_circle_detector.sharpen
+            )
+        else:
+            if masks is None:
+                masks = self.__material_masks(self.traditional_color_detector.normalize(_img, "material"), (x0, y0, x1, y1))
+            res = {color: self.traditional_color_detector.get_color_position(mask) for color, mask in masks.items()}
+        for color, position in res.items():
+            if position is not None:
+                res_dict[color] = (position[0] + x0, position[1] + y0, position[2], position[3])
 
+        # 物料位置交给转盘运动预测
+        self.turntable_predictor.update(
+            self.frame_time(),
+            {color: None if p is None else self.to_frame_point(p[:2]) for color, p in res_dict.items()},
+        )
         return res_dict
 
+    def __material_masks(self, _img:cv2.typing.MatLike, rect:tuple[int, int, int, int]) -> dict[str, cv2.typing.MatLike]:
+        """
+        物料识别区域内每个颜色的二值化图像
+        ----
+        Args:
+            _img (np.ndarray): 图片
+            rect (tuple): 识别区域 (x0, y0, x1, y1)
+        Returns:
+            dict: {颜色: 二值化图像}，坐标相对于识别区域的左上角
+        """
+        x0, y0, x1, y1 = rect
+        img_sharpen = self.annulus_circle_detector.sharpen(_img[y0:y1, x0:x1])  # 锐化
+        # 三种颜色共用一次滤波和HSV转换
+        return self.traditional_color_detector.binarization_multi(img_sharpen, tuple(COLOR_DIC.values()))
+
+    def __slot_occupancy(
+        self,
+        _img:cv2.typing.MatLike
+    ) -> tuple[dict[str, tuple[int, tuple[float, float]] | None] | None, dict[str, cv2.typing.MatLike] | None]:
+        """
+        用积分图快速判断每个颜色所在的位号
+        ----
+        本方法不是顶层需求
+
+        Args:
+            _img (np.ndarray): 图片
+        Returns:
+            tuple: (占用结果, 识别区域内的二值化图像)，
+                占用结果例如：{"R":(1, (x, y)), "G":(2, (x, y)), "B":None}，重心坐标相对于识别区域的左上角，
+                结果不明确时为None
+        """
+        x0, y0, x1, y1 = self.material_roi_rect(_img.shape) if self.material_roi else (0, 0, _img.shape[1], _img.shape[0])
+        if x1 <= x0 or y1 <= y0:
+            return None, None
+        _img = self.traditional_color_detector.normalize(_img, "material")
+        masks = self.__material_masks(_img, (x0, y0, x1, y1))
+        # 位号矩形转换到识别区域的坐标
+        rects = []
+        for area in (self.area1_points, self.area2_points, self.area3_points):
+            (ax0, ay0), (ax1, ay1) = self.from_frame_point(area[0]), self.from_frame_point(area[1])
+            rects.append((ax0 - x0, ay0 - y0, ax1 - x0, ay1 - y0))
+        occupancy = self.slot_occupancy.occupancy(  # type:ignore
+            masks,
+            rects,
+            self.traditional_color_detector.min_material_area,
+            self.traditional_color_detector.max_material_area,
+        )
+        if occupancy is not None:
+            if self.background_detector is not None:
+                # 这一帧不会再调用背景建模检测，背景模型照样更新，避免背景过时
+                self.background_detector.foreground(_img[y0:y1, x0:x1])
+            # 这一帧不会再提取轮廓，用像素的重心作为物料位置交给转盘运动预测
+            self.turntable_predictor.update(
+                self.frame_time(),
+                {
+                    color: None if item is None else self.to_frame_point((int(item[1][0]) + x0, int(item[1][1]) + y0))
+                    for color, item in occupancy.items()
+                },
+            )
+        return occupancy, masks
+
+    def material_roi_rect(self, shape:tuple) -> tuple[int, int, int, int]:
+        """
+        物料识别的区域
+        ----
+        三个位号区域的外接矩形，外扩material_roi_margin像素，限制在图像范围内
+
+        Args:
+            shape (tuple): 输入图像的形状
+        Returns:
+            tuple: 输入图像中的矩形 (x0, y0, x1, y1)
+        """
+        points = [
+            self.from_frame_point(point)
+            for area in (self.area1_points, self.area2_points, self.area3_points)
+            for point in area
+        ]
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        margin = self.material_roi_margin // self.frame_transform[2]
+        h, w = shape[:2]
+        return (
+            max(min(xs) - margin, 0),
+            max(min(ys) - margin, 0),
+            min(max(xs) + margin + 1, w),
+            min(max(ys) + margin + 1, h),
+        )
+
     def position2area(self, color_p_dict:dict[str,tuple[int,int,int,int]|None]) -> dict[str,int|None]:
         """
         将坐标字典转换成位号字典
@@ -295,7 +633,7 @@ class Solution(ConfigLoader):
                 color_area_dict[color] = None
                 continue
 
-            point = point_wh[:2]
+            point = self.to_frame_point(point_wh[:2])
             if self.area1_points[0][0] <= point[0] <= self.area1_points[1][0] and self.area1_points[0][1] <= point[1] <= self.area1_points[1][1]:
                 color_area_dict[color] = 1
             elif self.area2_points[0][0] <= point[0] <= self.area2_points[1][0] and self.area2_points[0][1] <= point[1] <= self.area2_points[1][1]:
@@ -308,6 +646,7 @@ class Solution(ConfigLoader):
     # endregion
 
     # region 直角检测
+    @traced
     def right_angle_detect(self, _img:cv2.typing.MatLike) -> tuple[str|None, cv2.typing.MatLike]:
         """
         直角检测
@@ -345,6 +684,7 @@ class Solution(ConfigLoader):
         )
 
         diff_angel = int((angel - self.target_angle)*10)
+        cross_point = self.output_point(cross_point)
 
         res1 = f"L{'0' if diff_angel < 0 else '1'}{str(abs(diff_angel)).rjust(3, '0')}"
         res3 =  f"{str(abs(cross_point[0])).rjust(3, '0')}"\
@@ -377,7 +717,7 @@ class Solution(ConfigLoader):
         for color in COLOR_DIC.values():
             bit_with_and_img = self.get_with_and_img(_img, color)
             res_bit_and = cv2.bitwise_or(res_bit_and, bit_with_and_img)
-            avg_point, avg_r, _ = self.annulus_detect_only(bit_with_and_img)
+            avg_point, avg_r, _ = self.annulus_detect_only(bit_with_and_img, color)
 
             if avg_point and avg_r:
                 # 画出圆环
@@ -408,6 +748,7 @@ class Solution(ConfigLoader):
         res_img = np.vstack((res_img, cv2.cvtColor(res_bit_and, cv2.COLOR_GRAY2BGR)))
         return annulus_dict, res_img
 
+    @traced
     def annulus_color_top(self, _img:cv2.typing.MatLike) -> tuple[str|None,cv2.typing.MatLike]:
         """
         地面圆环颜色和位置检测
@@ -470,7 +811,7 @@ class Solution(ConfigLoader):
             res_img (cv2.typing.MatLike): 按位与的图片
         """
         self.traditional_color_detector.update_range(color_name)
-        mask = self.traditional_color_detector.binarization(_img)
+        mask = self.traditional_color_detector.binarization(self.traditional_color_detector.normalize(_img, "annulus"))
 
         # 膨胀
         kernel = np.ones((5, 5), np.uint8)
@@ -479,7 +820,11 @@ class Solution(ConfigLoader):
         res_img = cv2.bitwise_and(_img, _img, mask=mask)
         return res_img
 
-    def annulus_detect_only(self, _img:cv2.typing.MatLike) -> tuple[tuple[int,int]|None,int|None,cv2.typing.MatLike]:
+    def annulus_detect_only(
+        self,
+        _img:cv2.typing.MatLike,
+        key:str = "annulus"
+    ) -> tuple[tuple[int,int]|None,int|None,cv2.typing.MatLike]:
         """
         圆环检测
         ----
@@ -487,11 +832,19 @@ class Solution(ConfigLoader):
 
         Args:
             _img (cv2.typing.MatLike): 图片
+            key (str): 圆环跟踪时区分调用者，同一帧中检测多个圆环(例如每个颜色一个)时各用一个
         Returns:
             res (tuple|None): 圆环的位置和半径以及滤波之后的灰度图
         """
         img = _img.copy()
-        points, rs, new_img = self.annulus_circle_detector.detect_circle(img)
+        full_search = self.pyramid_circle_detector.detect_circle if self.pyramid_circle_detector is not None else None
+        if self.annulus_circle_detector.tracking:
+            # 只在上一次圆环附近检测，没检测到时再检测整幅图
+            points, rs, new_img = self.annulus_circle_detector.track_circle(img, full_search, key)
+        elif full_search is not None:
+            points, rs, new_img = full_search(img)
+        else:
+            points, rs, new_img = self.annulus_circle_detector.detect_circle(img)
 
         if points is None or rs is None:
             return None, None, new_img
@@ -503,6 +856,7 @@ class Solution(ConfigLoader):
 
         return avg_point, avg_r, new_img
 
+    @traced
     def annulus_top(self, _img:cv2.typing.MatLike) -> tuple[str|None, cv2.typing.MatLike]:
         """
         圆环检测
@@ -543,6 +897,7 @@ class Solution(ConfigLoader):
         if avg_point is None or avg_r is None:
             return None, res_img
 
+        avg_point = self.output_point(avg_point)
         res =   f"L0000"\
                 f"{str(avg_point[0]).rjust(3, '0')}"\
                 f"{str(avg_point[1]).rjust(3, '0')}E"
@@ -0,0 +1,214 @@
+"""
+Copyright (C) 2025 IVEN-CN(He Yunfeng) and Anan-yy(Weng Kaiyi)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+背景建模物料检测
+====
+物料在转盘上运动，背景基本不变。用MOG2增量更新背景模型，只在前景连通域附近的小窗口里做颜色识别。
+
+* 前景中找到的颜色更新位置
+* 前景中没有找到的颜色只在原来的位置附近确认一次，物料被拿走了位置清空
+* 背景模型刚建立的若干帧和每隔若干帧做一次整幅图的颜色识别，修正累积的误差
+"""
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from .ColorDetect import TraditionalColorDetector
+from .Detect import Detect
+
+
+class BackgroundMaterialDetector(Detect):
+    """
+    背景建模物料检测器
+    ----
+    `detect` 的参数和返回值与 `PyramidColorDetector.detect` 相同，可以直接替换
+    """
+
+    history: int = 200          # 背景模型使用的帧数
+    var_threshold: float = 16   # 像素与背景模型的马氏距离平方阈值，越小越容易判为前景
+    learning_rate: float = -1   # 背景更新速度，-1为按history自动计算
+    warmup_frames: int = 10     # 背景模型刚建立时做整幅图识别的帧数
+    refresh_every: int = 60     # 每隔多少帧做一次整幅图识别，0为不做
+    min_fg_ratio: float = 0.25  # 前景连通域的最小面积占物料最小面积的比例
+    pad: int = 10               # 前景连通域外扩的像素数
+
+    def __init__(self, color_detector: TraditionalColorDetector, scanner=None):
+        """
+        初始化
+        ----
+        Args:
+            color_detector (TraditionalColorDetector): 颜色识别器
+            scanner: 整幅图识别使用的检测器(例如 `PyramidColorDetector`)，为None时直接使用颜色识别器
+        """
+        self.color_detector = color_detector
+        self.scanner = scanner
+        self.frame_count = 0
+        self.positions: dict[str, tuple[int, int, int, int] | None] = {}
+        self._subtractor: cv2.BackgroundSubtractorMOG2 | None = None
+        self._shape: tuple | None = None
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+    def reset(self):
+        """
+        重建背景模型，下一帧开始重新做整幅图识别
+        """
+        self._subtractor = None
+        self._shape = None
+        self.frame_count = 0
+        self.positions = {}
+
+    def full_scan(
+        self,
+        _img: cv2.typing.MatLike,
+        colors: tuple[str, ...],
+        prefilter: Callable | None = None
+    ) -> dict[str, tuple[int, int, int, int] | None]:
+        """
+        整幅图的颜色识别
+        """
+        if self.scanner is not None:
+            return self.scanner.detect(_img, colors, prefilter)
+        img = prefilter(_img) if prefilter is not None else _img
+        masks = self.color_detector.binarization_multi(img, colors)
+        return {color: self.color_detector.get_color_position(mask) for color, mask in masks.items()}
+
+    def foreground(self, _img: cv2.typing.MatLike) -> cv2.typing.MatLike:
+        """
+        更新背景模型并返回前景掩码
+        ----
+        Args:
+            _img (cv2.typing.MatLike): 图像，尺寸改变时重建背景模型
+        Returns:
+            cv2.typing.MatLike: 前景掩码，前景为255
+        """
+        if self._subtractor is None or self._shape != _img.shape:
+            self.reset()
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=self.history, varThreshold=self.var_threshold, detectShadows=False
+            )
+            self._shape = _img.shape
+        fg = self._subtractor.apply(_img, learningRate=self.learning_rate)
+        self.frame_count += 1
+        # 开运算去掉零散的噪点
+        return cv2.morphologyEx(fg, cv2.MORPH_OPEN, self._kernel)
+
+    def detect(
+        self,
+        _img: cv2.typing.MatLike,
+        colors: tuple[str, ...] = ("R", "G", "B"),
+        prefilter: Callable | None = None
+    ) -> dict[str, tuple[int, int, int, int] | None]:
+        """
+        检测物料位置
+        ----
+        Args:
+            _img (cv2.typing.MatLike): 图像，连续调用时尺寸应保持不变
+            colors (tuple): 颜色列表
+            prefilter (Callable): 颜色识别前对图像的处理(例如锐化)
+        Returns:
+            dict: {颜色: (x, y, w, h)}，没有检测到为None
+        """
+        fg = self.foreground(_img)
+        if self.frame_count <= self.warmup_frames \
+                or (self.refresh_every and self.frame_count % self.refresh_every == 0) \
+                or any(color not in self.positions for color in colors):
+            self.positions.update(self.full_scan(_img, colors, prefilter))
+            return {color: self.positions[color] for color in colors}
+
+        h, w = fg.shape[:2]
+        min_fg_area = self.color_detector.min_material_area * self.min_fg_ratio
+        n, _, stats, _ = cv2.connectedComponentsWithStats(fg, connectivity=8)
+
+        # 每个颜色取所有前景窗口中外接矩形最大的结果
+        found: dict[str, tuple[int, int, int, int]] = {}
+        for x, y, bw, bh, area in stats[1:n].tolist():
+            if area < min_fg_area:
+                continue
+            rect = (max(x - self.pad, 0), max(y - self.pad, 0), min(x + bw + self.pad, w), min(y + bh + self.pad, h))
+            for color, position in self.color_detector.detect_in_window(_img, rect, colors, prefilter, self.pad).items():
+                if position is None:
+                    continue
+                if color not in found or position[2] * position[3] > found[color][2] * found[color][3]:
+                    found[color] = position
+
+        for color in colors:
+            if color in found:
+                self.positions[color] = found[color]
+                continue
+            last = self.positions[color]
+            if last is None:
+                continue
+            # 前景中没有这个颜色，在原来的位置确认物料还在，不在说明物料被拿走了
+            cx, cy, lw, lh = last
+            rect = (
+                max(cx - lw // 2 - self.pad, 0), max(cy - lh // 2 - self.pad, 0),
+                min(cx + lw // 2 + self.pad + 1, w), min(cy + lh // 2 + self.pad + 1, h),
+            )
+            self.positions[color] = self.color_detector.detect_in_window(_img, rect, (color,), prefilter, self.pad)[color]
+        return {color: self.positions[color] for color in colors}
+
+    def save_config(self, config_path):
+        """
+        保存配置
+        ----
+        Args:
+            config_path (str): 配置文件路径
+        """
+        try:
+            config = super().load_config(config_path)
+        except:
+            config = {}
+
+        config["background"] = {
+            "history": self.history,
+            "var_threshold": self.var_threshold,
+            "learning_rate": self.learning_rate,
+            "warmup_frames": self.warmup_frames,
+            "refresh_every": self.refresh_every,
+            "min_fg_ratio": self.min_fg_ratio,
+            "pad": self.pad,
+        }
+
+        super().save_config(config_path, config)
+
+    def load_config(self, _config:str|dict):
+        """
+        加载配置
+        ----
+        Args:
+            _config (str|dict): 配置文件路径
+        """
+        res_str = ""
+
+        config = {}
+        try:
+            config = super().load_config(_config)
+            config = config["background"]
+        except KeyError:
+            res_str += f"配置文件{_config}中没有background的配置"
+
+        res_str += super().load_param(config, "history")
+        res_str += super().load_param(config, "var_threshold")
+        res_str += super().load_param(config, "learning_rate")
+        res_str += super().load_param(config, "warmup_frames")
+        res_str += super().load_param(config, "refresh_every")
+        res_str += super().load_param(config, "min_fg_ratio")
+        res_str += super().load_param(config, "pad")
+
+        # 参数改变之后重建背景模型
+        self.reset()
+        return res_str
@@ -34,6 +34,14 @@ CircleDetector类
             - `_img (numpy.ndarray)`: 需要检测的图像。
         返回:
             `tuple`: 圆心坐标列表和半径列表，如果没有检测到圆形则返回 (None, None)。
+    - `track_circle(self, _img, full_search=None)`:
+        跟踪圆形，只在上一次圆心附近的窗口中用上一次的半径范围检测，没有检测到时检测整幅图。
+
+        参数:
+            - `_img (numpy.ndarray)`: 需要检测的图像。
+            - `full_search (Callable)`: 检测整幅图使用的函数，默认为 `detect_circle`。
+        返回:
+            与 `detect_circle` 相同。
     - `save_config(self, jsion_path, circle_type)`:
         保存当前配置到指定的 JSON 文件中。
 
@@ -73,6 +81,13 @@ class CircleDetector(Detect):
     odd_index = 3   # 奇数索引
     iter_time:int = 1   # 闭运算迭代次数
 
+    # 跟踪参数
+    tracking:bool = False   # 是否只在上一次圆心附近检测
+    track_margin:int = 20   # 窗口在上一次圆环之外外扩的像素数
+    radius_tolerance:int = 5    # 半径范围在上一次半径之外放宽的像素数
+    # 每个调用者上一次的圆心和半径范围 {调用者: (x, y, rmin, rmax)}
+    _last_circles:dict[str, tuple[int, int, int, int]]|None = None
+
     @property
     def kernel_size(self):
         """kernel_size是第几个奇数"""
@@ -114,18 +129,22 @@ class CircleDetector(Detect):
         cv2.setTrackbarPos("sigma", "Trackbar", int(self.sigma * 10))
         cv2.setTrackbarPos("iter_time", "Trackbar", self.iter_time)
 
-    def detect_circle(self, _img) -> tuple[list[tuple[int,int]]|None,list[int]|None, cv2.typing.MatLike]:
+    def detect_circle(self, _img, draw: bool = True) -> tuple[list[tuple[int,int]]|None,list[int]|None, cv2.typing.MatLike]:
         """
         检测圆形
         ----
-        :param _img: 需要检测的图片
-        :return: 圆心坐标列表, 半径列表，没识别到圆环返回none，以及经过滤波的灰度
+        :param _img: 需要检测的图片，可以直接传入灰度解码的图片
+        :param draw: 是否拼接调试图像，为False时不做拼接和颜色转换，直接返回滤波之后的灰度图
+        :return: 圆心坐标列表, 半径列表，没识别到圆环返回none，以及原图和滤波之后的图像的拼接
         """
         point_lst = []
         r_lst = []
-        img = _img.copy()
+        if _img.ndim == 2:
+            # 已经是灰度图，省去拷贝和颜色转换
+            img = _img
+        else:
+            img = cv2.cvtColor(_img, cv2.COLOR_BGR2GRAY)
         # 滤波
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         img = cv2.medianBlur(img, self.kernel_size)
         img = cv2.GaussianBlur(
             img,
@@ -151,11 +170,14 @@ class CircleDetector(Detect):
             maxRadius=self.maxRadius,
         )
 
-        # 将原始图像和滤波后的图像拼接在一起
-        res_img = np.vstack([
-            _img,
-            cv2.cvtColor(img, cv2.COLOR_GRAY2BGR),
-        ])
+        if draw:
+            # 将原始图像和滤波后的图像拼接在一起，只有需要调试图像时才转换成BGR
+            res_img = np.vstack([
+                _img if _img.ndim == 3 else cv2.cvtColor(_img, cv2.COLOR_GRAY2BGR),
+                cv2.cvtColor(img, cv2.COLOR_GRAY2BGR),
+            ])
+        else:
+            res_img = img
 
         if circles is not None:
             circles = circles[0]
@@ -166,6 +188,74 @@ class CircleDetector(Detect):
             return point_lst, r_lst, res_img
         return None, None, res_img
 
+    def reset_tracking(self, key:str|None = None):
+        """
+        丢弃上一次的圆环，下一次从整幅图开始检测
+        ----
+        :param key: 调用者的名字，None时丢弃所有调用者的圆环
+        """
+        if key is None:
+            self._last_circles = None
+        elif self._last_circles is not None:
+            self._last_circles.pop(key, None)
+
+    def track_circle(
+        self,
+        _img,
+        full_search=None,
+        key:str = "default"
+    ) -> tuple[list[tuple[int,int]]|None,list[int]|None, cv2.typing.MatLike]:
+        """
+        跟踪圆形
+        ----
+        在上一次圆心附近的窗口中，用上一次的半径范围放宽 `radius_tolerance` 检测，
+        窗口中没有检测到或者还没有上一次的结果时检测整幅图。
+        同一帧中检测不同目标(例如三个颜色的圆环)时用不同的 `key`，各自保存上一次的圆环
+
+        :param _img: 需要检测的图片
+        :param full_search: 检测整幅图使用的函数，返回值与detect_circle相同，默认为detect_circle
+        :param key: 调用者的名字
+        :return: 与detect_circle相同，坐标为整幅图的坐标
+        """
+        if self._last_circles is None:
+            self._last_circles = {}
+        last = self._last_circles.get(key)
+        if last is not None:
+            x, y, rmin, rmax = last
+            half = rmax + self.radius_tolerance + self.track_margin
+            h, w = _img.shape[:2]
+            x0, y0 = max(x - half, 0), max(y - half, 0)
+            x1, y1 = min(x + half + 1, w), min(y + half + 1, h)
+
+            min_radius, max_radius = self.minRadius, self.maxRadius
+            self.minRadius = max(min_radius, rmin - self.radius_tolerance)
+            self.maxRadius = min(max_radius, rmax + self.radius_tolerance)
+            try:
+                points, rs, window_img = self.detect_circle(_img[y0:y1, x0:x1], draw=False)
+            finally:
+                self.minRadius, self.maxRadius = min_radius, max_radius
+
+            if points is not None and rs is not None:
+                points = [(px + x0, py + y0) for px, py in points]
+                self.__update_last(key, points, rs)
+                # 滤波图像只有窗口部分，放到整幅图大小的画布上
+                base = _img if _img.ndim == 3 else cv2.cvtColor(_img, cv2.COLOR_GRAY2BGR)
+                filtered = np.zeros_like(base)
+                filtered[y0:y1, x0:x1] = cv2.cvtColor(window_img, cv2.COLOR_GRAY2BGR)
+                return points, rs, np.vstack([base, filtered])
+
+        points, rs, res_img = (full_search or self.detect_circle)(_img)
+        if points is not None and rs is not None:
+            self.__update_last(key, points, rs)
+        else:
+            self._last_circles.pop(key, None)
+        return points, rs, res_img
+
+    def __update_last(self, key, points, rs):
+        # 与Solution.annulus_detect_only一致，取前5个圆环
+        x, y = np.mean(points[:5], axis=0)
+        self._last_circles[key] = (int(x), int(y), int(min(rs[:5])), int(max(rs[:5])))  # type:ignore
+
     def save_config(self, config_path):
         """
         保存配置
@@ -190,6 +280,9 @@ class CircleDetector(Detect):
             "sigma": self.sigma,
             "odd_index": self.odd_index,
             "iter_time": self.iter_time,
+            "tracking": self.tracking,
+            "track_margin": self.track_margin,
+            "radius_tolerance": self.radius_tolerance,
         }
 
         super().save_config(config_path, config)
@@ -222,5 +315,9 @@ class CircleDetector(Detect):
         res_str += super().load_param(config, "sigma")
         res_str += super().load_param(config, "odd_index")
         res_str += super().load_param(config, "iter_time")
+        res_str += super().load_param(config, "tracking")
+        res_str += super().load_param(config, "track_margin")
+        res_str += super().load_param(config, "radius_tolerance")
+        self.reset_tracking()
 
         return res_str
@@ -32,6 +32,15 @@ TraditionalColorDetector:
             - `_img`: 输入图像 (cv2.typing.MatLike)。
         返回:
             - 二值化后的图像 (numpy 数组)。
+    - `binarization_multi(_img: cv2.typing.MatLike, colors=("R", "G", "B"), labels=False) -> dict`:
+        滤波和HSV转换只做一次，得到多个颜色的二值化图像。
+
+        参数:
+            - `_img`: 输入图像 (cv2.typing.MatLike)。
+            - `colors`: 颜色列表。
+            - `labels`: 是否同时返回标签图。
+        返回:
+            - {颜色: 二值化图像}，labels为True时返回 (字典, 标签图)。
     - `createTrackbar()`:
         创建调节条，用于调整色相中心和误差。
     - `__callback(x: int)`:
@@ -53,7 +62,7 @@ TraditionalColorDetector:
 """
 
 import json
-from typing import Union
+from typing import Callable, NamedTuple, Union
 
 import cv2
 import numpy as np
@@ -69,6 +78,26 @@ COLOR_DICT: dict[Union[int, float, bool], str] = {
     2:'B',
 }
 
+class Blob(NamedTuple):
+    """
+    色块
+    ----
+    外接矩形左上角x,y和宽高w,h，面积(像素数)area，质心cx,cy
+    """
+    x: int
+    y: int
+    w: int
+    h: int
+    area: int
+    cx: float
+    cy: float
+
+    @property
+    def position(self) -> tuple[int, int, int, int]:
+        """外接矩形的中心点和宽高，与 `get_color_position` 的返回值格式相同"""
+        return self.x + self.w // 2, self.y + self.h // 2, self.w, self.h
+
+
 class TraditionalColorDetector(Detect):
     """
     传统颜色识别
@@ -93,6 +122,13 @@ class TraditionalColorDetector(Detect):
     min_material_area: int = 100000
     max_material_area: int = 300000
 
+    # 色块提取方式，contour为轮廓，components为连通域
+    blob_backend: str = "contour"
+
+    # 二值化前高斯滤波的核大小和标准差，金字塔模式下按缩小倍数调整
+    blur_ksize: int = 15
+    blur_sigma: float = 2
+
     color_index: int = 0
 
     color = COLOR_DICT[color_index]
@@ -145,6 +181,97 @@ class TraditionalColorDetector(Detect):
 
         self.update_range(color)
 
+    def preprocess(self, _img: cv2.typing.MatLike) -> cv2.typing.MatLike:
+        """
+        二值化前的预处理
+        ----
+        高斯滤波之后转换到HSV，多个颜色共用一次预处理的结果
+
+        Args:
+            _img(cv2.typing.MatLike): 输入图像
+        Returns:
+            cv2.typing.MatLike: HSV图像
+        """
+        # 高斯滤波，不会修改输入图像
+        img = cv2.GaussianBlur(_img, (self.blur_ksize, self.blur_ksize), self.blur_sigma)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+
+    @staticmethod
+    def hue_ranges(centre: int, error: int) -> list[tuple[int, int]]:
+        """
+        计算色相范围
+        ----
+        色相是环形的，超出0~180的部分分成两段
+
+        Args:
+            centre(int): 中心色相
+            error(int): 色相容差
+        Returns:
+            list: [(下限, 上限), ...]
+        """
+        minH = centre - error
+        maxH = centre + error
+        if minH < 0:
+            return [(0, maxH), (180 + minH, 180)]
+        elif maxH > 180:
+            return [(minH, 180), (0, maxH - 180)]
+        return [(minH, maxH)]
+
+    def mask_from_hsv(self, hsv: cv2.typing.MatLike, color: str) -> cv2.typing.MatLike:
+        """
+        用指定颜色的阈值对HSV图像二值化
+        ----
+        只读取 `color_threshold`，不改变当前颜色的状态
+
+        Args:
+            hsv(cv2.typing.MatLike): `preprocess` 得到的HSV图像
+            color(str): 颜色
+        Returns:
+            cv2.typing.MatLike: 二值化后的图像
+        """
+        threshold = self.color_threshold[color]
+        mask = None
+        for low_h, up_h in self.hue_ranges(threshold["centre"], threshold["error"]):
+            low = np.array([low_h, threshold["L_S"], threshold["L_V"]])
+            up = np.array([up_h, threshold["U_S"], threshold["U_V"]])
+            if mask is None:
+                mask = cv2.inRange(hsv, low, up)
+            else:
+                cv2.bitwise_or(mask, cv2.inRange(hsv, low, up), dst=mask)
+
+        kernel = np.ones((3, 3), np.uint8)
+        return cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=1)
+
+    def binarization_multi(
+        self,
+        _img: cv2.typing.MatLike,
+        colors: tuple[str, ...] = ("R", "G", "B"),
+        labels: bool = False
+    ) -> dict[str, cv2.typing.MatLike] | tuple[dict[str, cv2.typing.MatLike], cv2.typing.MatLike]:
+        """
+        多颜色二值化
+        ----
+        滤波和HSV转换只做一次，每个颜色只需要一次inRange
+
+        Args:
+            _img(cv2.typing.MatLike): 输入图像
+            colors(tuple): 颜色列表
+            labels(bool): 是否同时返回标签图
+        Returns:
+            dict: {颜色: 二值化后的图像}；
+                labels为True时返回 (字典, 标签图)，标签图第i位为1表示属于colors[i]，颜色重叠时多位同时为1
+        """
+        hsv = self.preprocess(_img)
+        masks = {color: self.mask_from_hsv(hsv, color) for color in colors}
+        if not labels:
+            return masks
+
+        label_img = np.zeros(hsv.shape[:2], np.uint8)
+        for i, color in enumerate(colors):
+            # mask为0或255，和1<<i按位与之后只保留这一位
+            cv2.bitwise_or(label_img, cv2.bitwise_and(masks[color], 1 << i), dst=label_img)
+        return masks, label_img
+
     def binarization(self, _img: cv2.typing.MatLike) -> cv2.typing.MatLike:
         """
         二值化
@@ -154,10 +281,7 @@ class TraditionalColorDetector(Detect):
         Returns:
             cv2.typing.MatLike: 二值化后的图像
         """
-        img = _img.copy()
-        # 高斯滤波
-        img = cv2.GaussianBlur(img, (15, 15), 2)
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+        hsv = self.preprocess(_img)
         if self.LOW_H2 is None:
             low = np.array([self.LOW_H1, self.L_S, self.L_V])
             up = np.array([self.UP_H1, self.U_S, self.U_V])
@@ -178,24 +302,63 @@ class TraditionalColorDetector(Detect):
 
         return mask
 
+    def get_color_blobs(self, binarized_img:cv2.typing.MatLike, max_blobs:int|None=None) -> list[Blob]:
+        """
+        获取所有符合面积要求的色块
+        ----
+        连通域的统计结果一次得到，面积筛选和排序都是对统计数组的向量运算，不需要逐个轮廓计算面积。
+        面积是连通域的像素数，不包括色块内部的空洞
+
+        Args:
+            binarized_img(cv2.typing.MatLike): 二值化图像
+            max_blobs(int): 最多返回的色块数，None时返回全部
+        Returns:
+            list[Blob]: 按面积从大到小排列的色块
+        """
+        n, _, stats, centroids = cv2.connectedComponentsWithStats(binarized_img, connectivity=8)
+        if n <= 1:
+            return []
+        # 第0个连通域是背景
+        stats, centroids = stats[1:], centroids[1:]
+        areas = stats[:, cv2.CC_STAT_AREA]
+        valid = np.flatnonzero((areas >= self.min_material_area) & (areas <= self.max_material_area))
+        if valid.size == 0:
+            return []
+        order = valid[np.argsort(-areas[valid], kind="stable")]
+        if max_blobs is not None:
+            order = order[:max_blobs]
+        return [
+            Blob(int(x), int(y), int(w), int(h), int(area), float(cx), float(cy))
+            for (x, y, w, h, area), (cx, cy) in zip(stats[order].tolist(), centroids[order].tolist())
+        ]
+
     def get_color_position(self, binarized_img:cv2.typing.MatLike) -> tuple[int, int, int, int] | None:
         """
         获取颜色位置
         ----
-        通过传入二值化的图像，然后取外接矩形的中心点作为颜色的位置
+        通过传入二值化的图像，然后取外接矩形的中心点作为颜色的位置。
+        blob_backend为components时使用连通域提取，取面积最大的色块
 
         Args:
             binarized_img(cv2.typing.MatLike): 二值化图像
         Returns:
             res(tuple[int, int, int, int]): 颜色中心点位置x,y和外接矩形的宽和高
         """
+        if self.blob_backend == "components":
+            blobs = self.get_color_blobs(binarized_img, 1)
+            return blobs[0].position if blobs else None
+
         contours, _ = cv2.findContours(binarized_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         if contours:
-            # 获取符合面积要求的轮廓
-            valid_contours = [cnt for cnt in contours if self.min_material_area <= cv2.contourArea(cnt) <= self.max_material_area]
+            # 获取符合面积要求的轮廓，每个轮廓的面积只计算一次
+            areas = [cv2.contourArea(cnt) for cnt in contours]
+            valid_contours = [
+                (area, cnt) for area, cnt in zip(areas, contours)
+                if self.min_material_area <= area <= self.max_material_area
+            ]
             if valid_contours:
                 # 获取最大的符合面积要求的轮廓
-                largest_contour = max(valid_contours, key=cv2.contourArea)
+                _, largest_contour = max(valid_contours, key=lambda item: item[0])
                 # 获取外接矩形
                 x, y, w, h = cv2.boundingRect(largest_contour)
                 # 计算矩形中心点
@@ -205,6 +368,54 @@ class TraditionalColorDetector(Detect):
                 return center_x, center_y, w, h
         return None
 
+    def detect_in_window(
+        self,
+        _img: cv2.typing.MatLike,
+        rect: tuple[int, int, int, int],
+        colors: tuple[str, ...] = ("R", "G", "B"),
+        prefilter: Callable | None = None,
+        pad: int = 10
+    ) -> dict[str, tuple[int, int, int, int] | None]:
+        """
+        在窗口中识别颜色位置
+        ----
+        色块被窗口截断时，以色块为中心扩大窗口重新识别一次
+
+        Args:
+            _img(cv2.typing.MatLike): 整幅图像
+            rect(tuple): 窗口 (x0, y0, x1, y1)，不包含右下角
+            colors(tuple): 颜色列表
+            prefilter(Callable): 二值化前对窗口的处理(例如锐化)
+            pad(int): 扩大窗口时色块外扩的像素数
+        Returns:
+            dict: {颜色: (x, y, w, h)}，坐标在整幅图像中，没有识别到为None
+        """
+        h, w = _img.shape[:2]
+        x0, y0, x1, y1 = max(rect[0], 0), max(rect[1], 0), min(rect[2], w), min(rect[3], h)
+        if x1 <= x0 or y1 <= y0:
+            return {color: None for color in colors}
+        window = _img[y0:y1, x0:x1]
+        if prefilter is not None:
+            window = prefilter(window)
+        res: dict[str, tuple[int, int, int, int] | None] = {}
+        for color, mask in self.binarization_multi(window, colors).items():
+            position = self.get_color_position(mask)
+            if position is None:
+                res[color] = None
+                continue
+            cx, cy, bw, bh = position[0] + x0, position[1] + y0, position[2], position[3]
+            touches = (cx - bw // 2 <= x0 and x0 > 0) or (cy - bh // 2 <= y0 and y0 > 0) \
+                or (cx + bw - bw // 2 >= x1 and x1 < w) or (cy + bh - bh // 2 >= y1 and y1 < h)
+            if touches:
+                # 窗口每次扩大到完整包住截断的色块，色块不再被截断或碰到图像边缘时结束
+                half = max(bw, bh) + pad
+                res[color] = self.detect_in_window(
+                    _img, (cx - half, cy - half, cx + half + 1, cy + half + 1), (color,), prefilter, pad
+                )[color]
+            else:
+                res[color] = (cx, cy, bw, bh)
+        return res
+
     def createTrackbar(self):
         """
         创建调节条
@@ -305,6 +516,10 @@ class TraditionalColorDetector(Detect):
         config["color"] = self.color_threshold
         config["min_material_area"] = self.min_material_area
         config["max_material_area"] = self.max_material_area
+        config["blob_backend"] = self.blob_backend
+        config["normalization"] = self.normalization
+        config["normalize_every"] = self.normalize_every
+        config["normalize_size"] = self.normalize_size
 
         super().save_config(path, config)
 
@@ -326,6 +541,11 @@ class TraditionalColorDetector(Detect):
 
         res_str += super().load_param(config_dict, "min_material_area")
         res_str += super().load_param(config_dict, "max_material_area")
+        res_str += super().load_param(config_dict, "blob_backend")
+        res_str += super().load_param(config_dict, "normalization")
+        res_str += super().load_param(config_dict, "normalize_every")
+        res_str += super().load_param(config_dict, "normalize_size")
+        self.reset_normalize()
 
         self.update_threshold("R")
 
@@ -24,9 +24,16 @@ class Detect(ConfigLoader):
     """
     检测器基类
     ----
-    提供了卷积锐化的方法--sharpen
+    提供了卷积锐化的方法--sharpen，光照归一化的方法--normalize
     """
 
+    # 光照归一化，none为不做，gray_world为灰度世界，white_patch为白点
+    normalization: str = "none"
+    normalize_every: int = 10   # 每隔多少次重新计算增益
+    normalize_size: int = 64    # 计算增益时把图像缩小到的宽度
+    # 每个调用者缓存的查找表和调用次数 {调用者: (查找表, 调用次数)}
+    _normalize_cache: dict[str, tuple[np.ndarray, int]] | None = None
+
     @staticmethod
     def sharpen(_img):
         """
@@ -41,3 +48,55 @@ class Detect(ConfigLoader):
         for i in range(3):
             img = cv2.GaussianBlur(img, (3, 3), 0)  # 高斯模糊
         return img
+
+    def normalize_gains(self, _img) -> np.ndarray:
+        """
+        计算每个通道的增益
+        ----
+        在缩小的图像上统计，gray_world让三个通道的均值相等，white_patch把每个通道的亮点(99%分位)拉到255
+
+        :param _img: BGR图片
+        :return: 三个通道的增益
+        """
+        h, w = _img.shape[:2]
+        size = (self.normalize_size, max(1, h * self.normalize_size // w))
+        small = cv2.resize(_img, size, interpolation=cv2.INTER_AREA).reshape(-1, 3).astype(np.float32)
+        if self.normalization == "white_patch":
+            ref = np.percentile(small, 99, axis=0)
+            gains = 255 / np.maximum(ref, 1)
+        else:
+            mean = small.mean(axis=0)
+            gains = mean.mean() / np.maximum(mean, 1)
+        # 避免大面积单色时增益过大
+        return np.clip(gains, 0.25, 4)
+
+    def normalize(self, _img, key: str = "default"):
+        """
+        光照归一化
+        ----
+        每 `normalize_every` 次调用重新计算一次增益，其余时间用缓存的查找表，每帧只需要一次cv2.LUT。
+        不同的调用者处理的画面不同，按 `key` 分别缓存增益和调用次数
+
+        :param _img: BGR图片
+        :param key: 调用者的名字
+        :return: 归一化之后的图片，normalization为none时直接返回原图
+        """
+        if self.normalization == "none" or _img.ndim != 3:
+            return _img
+        if self._normalize_cache is None:
+            self._normalize_cache = {}
+        lut, count = self._normalize_cache.get(key, (None, 0))
+        if lut is None or count % max(1, self.normalize_every) == 0:
+            gains = self.normalize_gains(_img)
+            lut = np.arange(256, dtype=np.float32)[:, None] * gains[None, :]
+            lut = np.clip(lut + 0.5, 0, 255).astype(np.uint8).reshape(1, 256, 3)
+        self._normalize_cache[key] = (lut, count + 1)
+        return cv2.LUT(_img, lut)
+
+    def reset_normalize(self):
+        """
+        丢弃所有调用者缓存的增益，下一次调用时重新计算
+        ----
+        切换采集配置或任务时调用，避免用上一个画面的增益
+        """
+        self._normalize_cache = None
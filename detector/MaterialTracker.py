@@ -0,0 +1,169 @@
+"""
+Copyright (C) 2025 IVEN-CN(He Yunfeng) and Anan-yy(Weng Kaiyi)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+物料跟踪
+====
+每个颜色一个匀速模型的卡尔曼滤波器，只在预测位置附近的窗口中识别，
+跟丢之后才做整幅图识别重新捕获，所有颜色都在跟踪时每帧的耗时和物料大小有关，和图像大小无关。
+
+* 窗口大小为物料的外接矩形加上 `margin` 和预测的速度
+* 窗口中没有识别到时该颜色跟丢，同一帧立即整幅图识别
+* 没有跟踪的颜色每帧都整幅图识别，不会因为没有跟踪而漏报
+"""
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from .ColorDetect import TraditionalColorDetector
+
+
+class Track:
+    """
+    单个颜色的跟踪状态
+    ----
+    状态为 (x, y, vx, vy)，观测为 (x, y)，时间间隔为一帧
+    """
+
+    def __init__(self, position: tuple[int, int, int, int], process_noise: float, measurement_noise: float):
+        kf = cv2.KalmanFilter(4, 2)
+        kf.transitionMatrix = np.array(
+            [[1, 0, 1, 0],
+             [0, 1, 0, 1],
+             [0, 0, 1, 0],
+             [0, 0, 0, 1]], np.float32
+        )
+        kf.measurementMatrix = np.eye(2, 4, dtype=np.float32)
+        kf.processNoiseCov = np.eye(4, dtype=np.float32) * process_noise
+        kf.measurementNoiseCov = np.eye(2, dtype=np.float32) * measurement_noise
+        kf.errorCovPost = np.eye(4, dtype=np.float32) * 10
+        kf.statePost = np.array([[position[0]], [position[1]], [0], [0]], np.float32)
+        self.kf = kf
+        self.size = position[2:]
+
+    def predict(self) -> tuple[float, float, float, float]:
+        """
+        预测下一帧的位置和速度
+        ----
+        Returns:
+            tuple: (x, y, vx, vy)
+        """
+        x, y, vx, vy = self.kf.predict()[:, 0]
+        return float(x), float(y), float(vx), float(vy)
+
+    def correct(self, position: tuple[int, int, int, int]):
+        """
+        用识别结果修正状态
+        """
+        self.kf.correct(np.array([[position[0]], [position[1]]], np.float32))
+        self.size = position[2:]
+
+
+class MaterialTracker:
+    """
+    物料跟踪器
+    ----
+    `detect` 的参数和返回值与 `PyramidColorDetector.detect` 相同，可以直接替换
+    """
+
+    margin: int = 15             # 窗口在物料外接矩形之外外扩的像素数
+    process_noise: float = 1.0   # 过程噪声，越大越相信识别结果
+    measurement_noise: float = 4.0  # 观测噪声，越大越相信匀速模型
+
+    def __init__(self, color_detector: TraditionalColorDetector, scanner=None):
+        """
+        初始化
+        ----
+        Args:
+            color_detector (TraditionalColorDetector): 颜色识别器
+            scanner: 整幅图识别使用的检测器(例如 `PyramidColorDetector`)，为None时直接使用颜色识别器
+        """
+        self.color_detector = color_detector
+        self.scanner = scanner
+        self.tracks: dict[str, Track] = {}
+        self._shape: tuple | None = None
+        # 统计整幅图识别的次数，用于调参
+        self.scan_count = 0
+
+    def reset(self):
+        """
+        丢弃所有跟踪，下一帧整幅图识别
+        """
+        self.tracks.clear()
+        self._shape = None
+
+    def full_scan(
+        self,
+        _img: cv2.typing.MatLike,
+        colors: tuple[str, ...],
+        prefilter: Callable | None = None
+    ) -> dict[str, tuple[int, int, int, int] | None]:
+        """
+        整幅图的颜色识别
+        """
+        self.scan_count += 1
+        if self.scanner is not None:
+            return self.scanner.detect(_img, colors, prefilter)
+        img = prefilter(_img) if prefilter is not None else _img
+        masks = self.color_detector.binarization_multi(img, colors)
+        return {color: self.color_detector.get_color_position(mask) for color, mask in masks.items()}
+
+    def detect(
+        self,
+        _img: cv2.typing.MatLike,
+        colors: tuple[str, ...] = ("R", "G", "B"),
+        prefilter: Callable | None = None
+    ) -> dict[str, tuple[int, int, int, int] | None]:
+        """
+        检测物料位置
+        ----
+        Args:
+            _img (cv2.typing.MatLike): 图像，尺寸改变时丢弃所有跟踪
+            colors (tuple): 颜色列表
+            prefilter (Callable): 二值化前对图像的处理(例如锐化)
+        Returns:
+            dict: {颜色: (x, y, w, h)}，没有检测到为None
+        """
+        if self._shape != _img.shape:
+            self.reset()
+            self._shape = _img.shape
+
+        res: dict[str, tuple[int, int, int, int] | None] = {color: None for color in colors}
+        lost: list[str] = []
+        for color in colors:
+            track = self.tracks.get(color)
+            if track is None:
+                lost.append(color)
+                continue
+            x, y, vx, vy = track.predict()
+            half_w = track.size[0] // 2 + self.margin + abs(vx)
+            half_h = track.size[1] // 2 + self.margin + abs(vy)
+            rect = (int(x - half_w), int(y - half_h), int(x + half_w) + 1, int(y + half_h) + 1)
+            position = self.color_detector.detect_in_window(_img, rect, (color,), prefilter, self.margin)[color]
+            if position is None:
+                # 跟丢了，这一帧立即重新捕获
+                del self.tracks[color]
+                lost.append(color)
+                continue
+            track.correct(position)
+            res[color] = position
+
+        if lost:
+            for color, position in self.full_scan(_img, tuple(lost), prefilter).items():
+                if position is not None:
+                    self.tracks[color] = Track(position, self.process_noise, self.measurement_noise)
+                res[color] = position
+        return res
@@ -0,0 +1,253 @@
+"""
+Copyright (C) 2025 IVEN-CN(He Yunfeng) and Anan-yy(Weng Kaiyi)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+金字塔检测模块
+====
+先在 `pyrDown` 缩小的图像上找候选的色块或圆环，再在原图中候选位置附近的小窗口里精确定位，
+返回的坐标都在原图坐标系中。
+
+* 面积、半径、滤波核等参数按缩小倍数自动换算，配置文件中的参数仍然是原图的参数
+* 包装已有的检测器，参数调整和重新加载配置都直接生效
+* 窗口中没有精确定位到时使用放大之后的粗略结果
+
+PyramidColorDetector:
+----
+包装 `TraditionalColorDetector`，检测多个颜色的物料位置
+
+PyramidCircleDetector:
+----
+包装 `CircleDetector`，检测圆环
+"""
+from contextlib import contextmanager
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from .CircleDetect import CircleDetector
+from .ColorDetect import TraditionalColorDetector
+
+
+def pyramid_down(_img: cv2.typing.MatLike, levels: int) -> cv2.typing.MatLike:
+    """
+    缩小图像
+    ----
+    Args:
+        _img (cv2.typing.MatLike): 图像
+        levels (int): 缩小的层数，每层宽高减半
+    Returns:
+        cv2.typing.MatLike: 缩小之后的图像
+    """
+    img = _img
+    for _ in range(levels):
+        img = cv2.pyrDown(img)
+    return img
+
+
+@contextmanager
+def override(obj, **attrs):
+    """
+    临时修改对象的属性，退出时恢复
+    """
+    old = {name: getattr(obj, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(obj, name, value)
+    try:
+        yield obj
+    finally:
+        for name, value in old.items():
+            setattr(obj, name, value)
+
+
+def _window(cx: float, cy: float, half_w: float, half_h: float, shape: tuple) -> tuple[int, int, int, int]:
+    """
+    以(cx, cy)为中心的窗口，限制在图像范围内
+    """
+    h, w = shape[:2]
+    x0 = max(int(cx - half_w), 0)
+    y0 = max(int(cy - half_h), 0)
+    x1 = min(int(np.ceil(cx + half_w)) + 1, w)
+    y1 = min(int(np.ceil(cy + half_h)) + 1, h)
+    return x0, y0, x1, y1
+
+
+class PyramidColorDetector:
+    """
+    金字塔颜色识别
+    ----
+    * 缩小的图像上找出每个颜色的候选色块(按面积排序)
+    * 在原图候选色块外接矩形外扩的窗口中重新二值化，得到精确的中心和宽高
+    """
+
+    def __init__(self, detector: TraditionalColorDetector, levels: int = 1, max_candidates: int = 2):
+        """
+        初始化
+        ----
+        Args:
+            detector (TraditionalColorDetector): 颜色识别器
+            levels (int): 金字塔层数，1为缩小一半
+            max_candidates (int): 每个颜色最多精确定位的候选色块数
+        """
+        self.detector = detector
+        self.levels = levels
+        self.max_candidates = max_candidates
+
+    @property
+    def scale(self) -> int:
+        return 1 << self.levels
+
+    def _coarse_params(self) -> dict:
+        """
+        缩小图像上使用的参数
+        ----
+        面积按倍数的平方缩小，pyrDown本身带有5x5的高斯滤波，滤波核按倍数缩小
+        """
+        d, s = self.detector, self.scale
+        ksize = max(3, (d.blur_ksize // s) | 1)
+        return {
+            "min_material_area": d.min_material_area // (s * s),
+            "max_material_area": d.max_material_area // (s * s),
+            "blur_ksize": ksize,
+            "blur_sigma": d.blur_sigma / s,
+        }
+
+    def detect(
+        self,
+        _img: cv2.typing.MatLike,
+        colors: tuple[str, ...] = ("R", "G", "B"),
+        prefilter: Callable | None = None
+    ) -> dict[str, tuple[int, int, int, int] | None]:
+        """
+        检测物料位置
+        ----
+        Args:
+            _img (cv2.typing.MatLike): 原图
+            colors (tuple): 颜色列表
+            prefilter (Callable): 二值化前对图像的处理(例如锐化)，分别作用在缩小的图像和精确定位的窗口上
+        Returns:
+            dict: {颜色: (x, y, w, h)}，坐标为原图中外接矩形的中心，没有检测到为None
+        """
+        d, s = self.detector, self.scale
+        small = pyramid_down(_img, self.levels)
+        if prefilter is not None:
+            small = prefilter(small)
+
+        with override(d, **self._coarse_params()):
+            masks = d.binarization_multi(small, colors)
+            candidates = {color: d.get_color_blobs(mask, self.max_candidates) for color, mask in masks.items()}
+
+        # 窗口外扩：候选框放大误差 + 滤波核半径
+        pad = 2 * s + d.blur_ksize // 2
+        res: dict[str, tuple[int, int, int, int] | None] = {color: None for color in colors}
+        for color, blobs in candidates.items():
+            for blob in blobs:
+                cx, cy = (blob.x + blob.w / 2) * s, (blob.y + blob.h / 2) * s
+                x0, y0, x1, y1 = _window(cx, cy, blob.w * s / 2 + pad, blob.h * s / 2 + pad, _img.shape)
+                window = _img[y0:y1, x0:x1]
+                if prefilter is not None:
+                    window = prefilter(window)
+                mask = d.binarization_multi(window, (color,))[color]
+                position = d.get_color_position(mask)
+                if position is not None:
+                    res[color] = (position[0] + x0, position[1] + y0, position[2], position[3])
+                    break
+            else:
+                if blobs:
+                    # 窗口中没有符合面积要求的色块，使用放大之后的粗略结果
+                    blob = blobs[0]
+                    res[color] = ((blob.x * 2 + blob.w) * s // 2, (blob.y * 2 + blob.h) * s // 2, blob.w * s, blob.h * s)
+        return res
+
+
+class PyramidCircleDetector:
+    """
+    金字塔圆环检测
+    ----
+    * 缩小的图像上用缩小的半径范围做霍夫圆检测
+    * 在原图每个候选圆附近的窗口中，用候选半径附近的小范围重新检测
+    """
+
+    def __init__(self, detector: CircleDetector, levels: int = 1):
+        """
+        初始化
+        ----
+        Args:
+            detector (CircleDetector): 圆环识别器
+            levels (int): 金字塔层数，1为缩小一半
+        """
+        self.detector = detector
+        self.levels = levels
+
+    @property
+    def scale(self) -> int:
+        return 1 << self.levels
+
+    def _coarse_params(self) -> dict:
+        """
+        缩小图像上使用的参数
+        ----
+        距离和半径按倍数缩小，累加器阈值和圆周长成正比，也按倍数缩小
+        """
+        d, s = self.detector, self.scale
+        ksize = max(1, d.kernel_size // s)
+        return {
+            "minDist": max(1, d.minDist // s),
+            "minRadius": max(1, d.minRadius // s),
+            "maxRadius": max(2, -(-d.maxRadius // s)),
+            "param2": max(1, d.param2 // s),
+            "odd_index": ((ksize | 1) + 1) // 2,
+            "sigma": d.sigma / s,
+        }
+
+    def detect_circle(self, _img) -> tuple[list[tuple[int,int]]|None, list[int]|None, cv2.typing.MatLike]:
+        """
+        检测圆形
+        ----
+        返回值与 `CircleDetector.detect_circle` 相同，坐标和半径在原图坐标系中，
+        拼接的滤波图像是缩小图像的滤波结果放大到原图大小
+        """
+        d, s = self.detector, self.scale
+        small = pyramid_down(_img, self.levels)
+        with override(d, **self._coarse_params()):
+            points, rs, small_filtered = d.detect_circle(small, draw=False)
+
+        h, w = _img.shape[:2]
+        filtered = cv2.cvtColor(cv2.resize(small_filtered, (w, h), interpolation=cv2.INTER_NEAREST), cv2.COLOR_GRAY2BGR)
+        base = _img if _img.ndim == 3 else cv2.cvtColor(_img, cv2.COLOR_GRAY2BGR)
+        res_img = np.vstack([base, filtered])
+        if points is None or rs is None:
+            return None, None, res_img
+
+        point_lst, r_lst = [], []
+        pad = 2 * s + d.kernel_size
+        for (x, y), r in zip(points, rs):
+            cx, cy, cr = x * s, y * s, r * s
+            x0, y0, x1, y1 = _window(cx, cy, cr + pad, cr + pad, _img.shape)
+            with override(
+                d,
+                minRadius=max(1, cr - 2 * s),
+                maxRadius=cr + 2 * s,
+                # 一个窗口里只需要一个圆
+                minDist=max(x1 - x0, y1 - y0),
+            ):
+                fine_points, fine_rs, _ = d.detect_circle(_img[y0:y1, x0:x1], draw=False)
+            if fine_points:
+                point_lst.append((fine_points[0][0] + x0, fine_points[0][1] + y0))
+                r_lst.append(fine_rs[0])
+            else:
+                point_lst.append((cx, cy))
+                r_lst.append(cr)
+        return point_lst, r_lst, res_img
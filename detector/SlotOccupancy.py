@@ -0,0 +1,146 @@
+"""
+Copyright (C) 2025 IVEN-CN(He Yunfeng) and Anan-yy(Weng Kaiyi)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+位号占用检测
+====
+对每个颜色的二值化图像求积分图，每个位号矩形内的像素数只需要查4个点，像素总数就是积分图右下角的值，
+只有像素最多的位号需要再做一次小窗口的连通域分析，不需要对整幅图提取轮廓就能判断每个颜色在哪个位号。
+
+阈值使用和逐个提取轮廓(`get_color_position`)相同的面积范围，只在结果明显时才给出答案：
+* 颜色的像素总数小于物料的最小面积 -> 不可能有符合面积要求的色块，不在位号中
+* 像素总数不超过物料的最大面积，位号外的像素数不足最小面积，并且远少于位号中的像素数，
+  位号中最大的连通域面积在物料的面积范围内 -> 该位号
+* 其他情况(物料压在两个位号之间、位号外还有大色块、位号中的像素很零散、两个颜色占同一个位号等)返回None，
+  由调用者回退到 `get_color_position` 逐个提取轮廓
+
+连通域按像素数计算面积，轮廓面积略小于像素数，物料面积刚好在最小面积附近时两者仍可能有分歧
+"""
+import cv2
+import numpy as np
+
+
+def _clip_rects(rects: list[tuple[int, int, int, int]], shape: tuple) -> tuple[np.ndarray, ...]:
+    """
+    矩形截断到图像范围内，返回不包含右下角的 (x0, y0, x1, y1) 数组
+    """
+    h, w = shape[:2]
+    r = np.array(rects, np.int64).reshape(-1, 4)
+    return (
+        np.clip(r[:, 0], 0, w),
+        np.clip(r[:, 1], 0, h),
+        np.clip(r[:, 2] + 1, 0, w),
+        np.clip(r[:, 3] + 1, 0, h),
+    )
+
+
+def _rect_sums(ii: np.ndarray, rects: list[tuple[int, int, int, int]]) -> np.ndarray:
+    """
+    用积分图统计每个矩形内的非零像素数
+    """
+    # 积分图比原图多一行一列，ii[y, x]为左上角(0,0)到(x-1,y-1)的和
+    x0, y0, x1, y1 = _clip_rects(rects, (ii.shape[0] - 1, ii.shape[1] - 1))
+    sums = ii[y1, x1] - ii[y0, x1] - ii[y1, x0] + ii[y0, x0]
+    # 矩形完全在图像外时截断之后右下角可能在左上角之前
+    sums[(x1 <= x0) | (y1 <= y0)] = 0
+    return sums // 255
+
+
+def integral_counts(binarized_img: cv2.typing.MatLike, rects: list[tuple[int, int, int, int]]) -> np.ndarray:
+    """
+    统计每个矩形内的非零像素数
+    ----
+    Args:
+        binarized_img (cv2.typing.MatLike): 二值化图像，像素值为0或255
+        rects (list): 矩形列表 [(x0, y0, x1, y1)]，包含右下角的点，超出图像的部分会被截掉
+    Returns:
+        np.ndarray: 每个矩形内的像素数
+    """
+    return _rect_sums(cv2.integral(binarized_img), rects)
+
+
+class SlotOccupancy:
+    """
+    位号占用检测
+    ----
+    * 阈值使用颜色识别器的物料最小、最大面积
+    """
+
+    dominance: float = 0.2      # 位号外的像素数不超过位号中像素数的这个比例
+
+    def counts(
+        self,
+        masks: dict[str, cv2.typing.MatLike],
+        rects: list[tuple[int, int, int, int]]
+    ) -> dict[str, np.ndarray]:
+        """
+        每个颜色在每个位号中的像素数
+        ----
+        Args:
+            masks (dict): {颜色: 二值化图像}
+            rects (list): 位号矩形列表 [(x0, y0, x1, y1)]
+        Returns:
+            dict: {颜色: 每个位号中的像素数}
+        """
+        return {color: integral_counts(mask, rects) for color, mask in masks.items()}
+
+    def occupancy(
+        self,
+        masks: dict[str, cv2.typing.MatLike],
+        rects: list[tuple[int, int, int, int]],
+        min_area: int,
+        max_area: int
+    ) -> dict[str, tuple[int, tuple[float, float]] | None] | None:
+        """
+        判断每个颜色所在的位号
+        ----
+        Args:
+            masks (dict): {颜色: 二值化图像}
+            rects (list): 位号矩形列表 [(x0, y0, x1, y1)]，第i个矩形为i+1号位
+            min_area (int): 物料的最小面积
+            max_area (int): 物料的最大面积
+        Returns:
+            dict|None: {颜色: (位号, 位号中最大连通域的重心(x, y))}，不在位号中为None；结果不明确时返回None
+        """
+        res: dict[str, tuple[int, tuple[float, float]] | None] = {}
+        for color, mask in masks.items():
+            ii = cv2.integral(mask)
+            total = int(ii[-1, -1]) // 255
+            if total < min_area:
+                res[color] = None
+                continue
+            counts = _rect_sums(ii, rects)
+            best = int(np.argmax(counts))
+            best_count = int(counts[best])
+            outside = total - best_count
+            if total > max_area or best_count < min_area or outside >= min_area or outside > best_count * self.dominance:
+                return None
+
+            # 只在像素最多的位号中做连通域分析，像素零散、没有足够大的色块时交给轮廓提取
+            x0, y0, x1, y1 = (int(v[best]) for v in _clip_rects(rects, mask.shape))
+            n, _, stats, centroids = cv2.connectedComponentsWithStats(mask[y0:y1, x0:x1], connectivity=8)
+            if n <= 1:
+                return None
+            largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+            if stats[largest, cv2.CC_STAT_AREA] < min_area:
+                return None
+            cx, cy = centroids[largest]
+            res[color] = (best + 1, (float(cx) + x0, float(cy) + y0))
+
+        areas = [item[0] for item in res.values() if item is not None]
+        if len(areas) != len(set(areas)):
+            # 两个颜色占同一个位号
+            return None
+        return res
@@ -0,0 +1,199 @@
+"""
+Copyright (C) 2025 IVEN-CN(He Yunfeng) and Anan-yy(Weng Kaiyi)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+转盘运动预测
+====
+根据每帧的物料位置估计转盘的转动中心、角速度和每个物料的相位，预测物料到达每个位号的时间，
+电控可以提前动作，不需要等物料运动检测的结果。
+
+* 转动中心：配置了就用配置的，否则用所有物料最近的位置拟合同心圆(每个颜色半径不同，圆心相同)
+* 角速度：每个颜色在时间窗口内展开之后的角度对时间做线性回归，按样本数加权平均
+* 到达时间：物料当前角度沿转动方向转到位号中心角度所需的时间
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+
+class TurntablePredictor:
+    """
+    转盘运动预测器
+    ----
+    坐标、时间的单位由调用者决定，一般为采集画面的像素坐标和time.perf_counter的秒
+    """
+
+    window: float = 2.0         # 参与拟合的时间窗口(s)
+    min_samples: int = 5        # 一个颜色至少需要的样本数
+    min_omega: float = 0.05     # 角速度小于这个值(rad/s)认为转盘没有转动
+    min_radius: float = 5       # 物料到转动中心的距离小于这个值时角度不可靠
+
+    def __init__(self, centre: tuple[float, float] | None = None):
+        """
+        初始化
+        ----
+        Args:
+            centre (tuple): 转动中心，为None时根据物料位置拟合
+        """
+        self.fixed_centre = centre
+        self.samples: dict[str, deque[tuple[float, float, float]]] = {}
+        self._fit: tuple[tuple[float, float] | None, float | None, dict[str, tuple[float, float, float]]] | None = None
+
+    @classmethod
+    def from_config(cls, config: dict | None) -> "TurntablePredictor":
+        """
+        从配置创建
+        ----
+        Args:
+            config (dict): 配置，包含centre、window、min_samples、min_omega，缺少的使用默认值
+        """
+        config = config or {}
+        centre = config.get("centre")
+        predictor = cls(tuple(centre) if centre is not None else None)  # type:ignore
+        for key in ("window", "min_samples", "min_omega", "min_radius"):
+            if config.get(key) is not None:
+                setattr(predictor, key, config[key])
+        return predictor
+
+    def reset(self):
+        """
+        清空所有样本
+        """
+        self.samples.clear()
+        self._fit = None
+
+    def update(self, t: float, positions: dict[str, tuple[int, int] | None]):
+        """
+        加入一帧的物料位置
+        ----
+        Args:
+            t (float): 时间
+            positions (dict): {颜色: (x, y)}，没有识别到为None
+        """
+        for color, point in positions.items():
+            if point is None:
+                continue
+            samples = self.samples.setdefault(color, deque())
+            samples.append((t, float(point[0]), float(point[1])))
+        for samples in self.samples.values():
+            while samples and samples[0][0] < t - self.window:
+                samples.popleft()
+        self._fit = None
+
+    def _fit_centre(self) -> tuple[float, float] | None:
+        """
+        拟合同心圆的圆心
+        ----
+        x^2 + y^2 = 2ax + 2by + c_k，圆心(a, b)为所有颜色共用，c_k每个颜色一个，线性最小二乘求解
+        """
+        colors = [color for color, samples in self.samples.items() if len(samples) >= self.min_samples]
+        if not colors:
+            return None
+        rows, rhs = [], []
+        for k, color in enumerate(colors):
+            for _, x, y in self.samples[color]:
+                row = [2 * x, 2 * y] + [0.0] * len(colors)
+                row[2 + k] = 1.0
+                rows.append(row)
+                rhs.append(x * x + y * y)
+        A, b = np.array(rows), np.array(rhs)
+        sol, _, rank, _ = np.linalg.lstsq(A, b, rcond=None)
+        if rank < A.shape[1]:
+            return None
+        # 物料还没有转过足够的角度时圆心不可靠，要求每个颜色的半径平方为正
+        a, b0 = sol[0], sol[1]
+        if any(sol[2 + k] + a * a + b0 * b0 <= self.min_radius ** 2 for k in range(len(colors))):
+            return None
+        return float(a), float(b0)
+
+    def fit(self) -> tuple[tuple[float, float] | None, float | None, dict[str, tuple[float, float, float]]]:
+        """
+        拟合转动中心、角速度和每个颜色的相位
+        ----
+        Returns:
+            tuple: (转动中心, 角速度(rad/每单位时间), {颜色: (参考时间, 参考时间的角度, 角速度)})，
+                无法估计的量为None
+        """
+        if self._fit is not None:
+            return self._fit
+        centre = self.fixed_centre if self.fixed_centre is not None else self._fit_centre()
+        phases: dict[str, tuple[float, float, float]] = {}
+        if centre is None:
+            self._fit = (None, None, phases)
+            return self._fit
+
+        weights, omegas = [], []
+        for color, samples in self.samples.items():
+            if len(samples) < self.min_samples:
+                continue
+            arr = np.array(samples)
+            dx, dy = arr[:, 1] - centre[0], arr[:, 2] - centre[1]
+            keep = np.hypot(dx, dy) >= self.min_radius
+            if keep.sum() < self.min_samples:
+                continue
+            ts = arr[keep, 0]
+            angles = np.unwrap(np.arctan2(dy[keep], dx[keep]))
+            t0 = ts[-1]
+            if ts[0] == t0:
+                continue
+            omega, phase = np.polyfit(ts - t0, angles, 1)
+            phases[color] = (float(t0), float(phase), float(omega))
+            weights.append(len(ts))
+            omegas.append(omega)
+
+        omega = float(np.average(omegas, weights=weights)) if omegas else None
+        self._fit = (centre, omega, phases)
+        return self._fit
+
+    @property
+    def centre(self) -> tuple[float, float] | None:
+        return self.fit()[0]
+
+    @property
+    def omega(self) -> float | None:
+        return self.fit()[1]
+
+    def angle(self, color: str, t: float) -> float | None:
+        """
+        预测颜色在t时刻的角度
+        ----
+        所有颜色在同一个转盘上，使用共同的角速度外推
+        """
+        _, omega, phases = self.fit()
+        if omega is None or color not in phases:
+            return None
+        t0, phase, _ = phases[color]
+        return phase + omega * (t - t0)
+
+    def time_to(self, color: str, point: tuple[float, float], t: float) -> float | None:
+        """
+        预测颜色从t时刻开始转到point所在角度需要的时间
+        ----
+        Args:
+            color (str): 颜色
+            point (tuple): 目标点，一般为位号的中心
+            t (float): 当前时间
+        Returns:
+            float|None: 需要的时间，转盘没有转动或无法估计时为None
+        """
+        centre, omega, _ = self.fit()
+        angle = self.angle(color, t)
+        if centre is None or omega is None or angle is None or abs(omega) < self.min_omega:
+            return None
+        target = math.atan2(point[1] - centre[1], point[0] - centre[0])
+        # 沿转动方向的角度差，范围[0, 2π)
+        delta = (target - angle) % (2 * math.pi) if omega > 0 else (angle - target) % (2 * math.pi)
+        return delta / abs(omega)
@@ -61,6 +61,12 @@ TraditionalColorDetector:
             - `_img`: 输入图像 (cv2.typing.MatLike)。
         返回:
             - 二值化后的图像 (numpy 数组)。
+    - `binarization_multi(_img, colors=("R", "G", "B"), labels=False) -> dict`:
+        滤波和HSV转换只做一次，得到多个颜色的二值化图像，可以同时返回标签图。
+    - `get_color_blobs(binarized_img, max_blobs=None) -> list[Blob]`:
+        用连通域统计提取所有符合面积要求的色块，返回外接矩形、面积和质心，按面积从大到小排列。
+    - `detect_in_window(_img, rect, colors=("R", "G", "B"), prefilter=None, pad=10) -> dict`:
+        只在窗口中识别颜色位置，返回整幅图像中的坐标，色块被窗口截断时扩大窗口重新识别。
     - `createTrackbar()`:
         创建调节条，用于调整色相中心和误差。
     - `__callback(x: int)`:
@@ -80,6 +86,57 @@ TraditionalColorDetector:
         参数:
             - `path`: 文件路径 (str)。
 
+PyramidColorDetector / PyramidCircleDetector:
+--------
+包装颜色识别器和圆环识别器，先在 `pyrDown` 缩小的图像上找候选，再在原图候选附近的小窗口中精确定位。
+面积、半径、滤波核等参数按缩小倍数自动换算。
+
+方法:
+    - `PyramidColorDetector.detect(_img, colors=("R", "G", "B"), prefilter=None) -> dict`:
+        返回 {颜色: (x, y, w, h)}，坐标在原图坐标系中。
+    - `PyramidCircleDetector.detect_circle(_img) -> tuple`:
+        返回值与 `CircleDetector.detect_circle` 相同。
+
+SlotOccupancy:
+--------
+对每个颜色的二值化图像求积分图，O(1) 读出每个位号矩形内的像素数，判断每个颜色所在的位号。
+
+方法:
+    - `occupancy(masks, rects, min_area, max_area) -> dict|None`:
+        返回 {颜色: (位号, 位号中最大连通域的重心)}，面积阈值和 `get_color_position` 相同，
+        物料压在两个位号之间、像素零散等结果不明确的情况返回None。
+
+BackgroundMaterialDetector:
+--------
+用MOG2增量更新背景模型，只在前景连通域附近的小窗口中做颜色识别，前景中没有出现的物料保留上一次的位置。
+背景模型刚建立时和每隔 `refresh_every` 帧做一次整幅图识别。
+
+方法:
+    - `detect(_img, colors=("R", "G", "B"), prefilter=None) -> dict`:
+        返回 {颜色: (x, y, w, h)}，与 `PyramidColorDetector.detect` 相同。
+    - `reset()`:
+        重建背景模型。
+
+MaterialTracker:
+--------
+每个颜色一个匀速模型的卡尔曼滤波器，只在预测位置附近的窗口中识别，没有跟踪的颜色每帧整幅图识别重新捕获。
+
+方法:
+    - `detect(_img, colors=("R", "G", "B"), prefilter=None) -> dict`:
+        返回 {颜色: (x, y, w, h)}，与 `PyramidColorDetector.detect` 相同。
+    - `reset()`:
+        丢弃所有跟踪。
+
+TurntablePredictor:
+--------
+根据每帧的物料位置估计转盘的转动中心、角速度和每个物料的相位，预测物料转到某个位置需要的时间。
+
+方法:
+    - `update(t, positions)`:
+        加入一帧的物料位置 {颜色: (x, y)}。
+    - `time_to(color, point, t) -> float|None`:
+        颜色从t时刻开始转到point所在角度需要的时间，转盘没有转动或无法估计时为None。
+
 LineDetector类
 --------
 继承自 Detect 类，用于检测图像中的直线，并提供以下功能：
@@ -114,5 +171,15 @@ LineDetector类
 from .CircleDetect import CircleDetector
 from .ColorDetect import *
 from .LineDetect import LineDetector
-
-__all__ = ["CircleDetector", "TraditionalColorDetector", "LineDetector"]
+from .PyramidDetect import PyramidCircleDetector, PyramidColorDetector
+from .SlotOccupancy import SlotOccupancy
+from .BackgroundDetect import BackgroundMaterialDetector
+from .MaterialTracker import MaterialTracker
+from .TurntablePredictor import TurntablePredictor
+
+__all__ = [
+    "CircleDetector", "TraditionalColorDetector", "Blob", "LineDetector",
+    "PyramidColorDetector", "PyramidCircleDetector", "SlotOccupancy",
+    "BackgroundMaterialDetector", "MaterialTracker",
+    "TurntablePredictor",
+]
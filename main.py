@@ -36,17 +36,22 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
                              工创国一！！
 """
 import time
+import json
 import argparse
+import threading
+import multiprocessing
 
 import cv2
 from colorama import Fore, init
 import numpy as np
+import yaml
 
 import Solution
 from ImgTrans import SendImg, SendImgTCP, SendImgUDP
-from utils import Cap, Switch, LED, OLED_I2C, connect_to_wifi, get_CPU_temp, get_GPU_temp, printLog
+from utils import Cap, ThreadedCap, FramePool, ReplayCap, FrameBusReader, Switch, LED, OLED_I2C, connect_to_wifi, get_CPU_temp, get_GPU_temp, printLog
 from ImgTrans.ImgTrans import NeedReConnect
 from utils.UART import Uart
+from utils.frame_bus import BUS_NAME, run_capture, run_recorder
 
 init(autoreset=True)
 
@@ -56,7 +61,6 @@ class MainSystem:
     """
     ori_imgTrans_running_flag = False  # 原始图像是否正在传输
     task_running_flag = False  # 任务是否正在运行
-    read_empty_frame_num:int = 0  # 读取空帧的次数
     missed_frames:int = 0  # 没有识别到图像的帧数
 
 
@@ -67,6 +71,8 @@ class MainSystem:
         pgkTAIL:str,
         sender_debug: SendImg | None = None,
         config_path: str = "config.yaml",
+        cap: Cap | ReplayCap | FrameBusReader | None = None,
+        background_stream: bool = False,
     ) -> None:
         """
         主系统
@@ -77,15 +83,20 @@ class MainSystem:
             pgkTAIL (str): 包尾
             sender_debug (SendImg): 调试图传发送器
             config_path (str): 配置文件路径
+            cap (Cap|ReplayCap|FrameBusReader): 采集源，默认打开后台抓帧的摄像头，传入ReplayCap可以离线回放，
+                传入FrameBusReader时从帧总线读取
+            background_stream (bool): 图传是否由独立的进程负责，此时开关只控制任务
         """
         self.solution = Solution.Solution(ser_port, config_path)
         self.shower = Uart("/dev/ttyUSB0", 115200)
-        self.cap = Cap()
+        # raw模式下按任务的采集配置解码，例如圆环检测只解码灰度
+        self.cap = cap if cap is not None else ThreadedCap(pool=FramePool(), raw=True)
         self.switch = Switch("GPIO3-A3", True)
         self.start_LED = LED("GPIO3-A2")
         self.detecting_LED = LED("GPIO3-A4")
         self.oled = OLED_I2C(2,0x3c)
         self.sender_debug = sender_debug
+        self.background_stream = background_stream
         self.HEAD = pkgHEAD
         self.TAIL = pgkTAIL
         self.DEAL_IMG_DICT = {"hide": lambda x: None}
@@ -96,6 +107,7 @@ class MainSystem:
             "3": self.solution.right_angle_detect,  # 直角检测
             "4": self.solution.annulus_top,  # 圆环检测
             "5": self.clear_img_buffer,  # 清空缓冲区
+            "6": self.solution.material_arrival,  # 物料到达位号的时间预测
             None: lambda x: tuple(["1",cv2.putText(
                                     np.zeros((240, 320, 3), dtype=np.uint8),
                                     "no any sign",
@@ -107,10 +119,12 @@ class MainSystem:
                                 )])
         }
 
-        # 先读取20帧，打开摄像头
-        for i in range(20):
-            tmp_img = self.cap.read()[1]
-            self.DEAL_IMG_DICT["hide"](tmp_img)
+        # 等待摄像头曝光收敛
+        converged, elapsed, frames = self.cap.warm_up()
+        printLog(
+            (Fore.GREEN + "摄像头预热完成" if converged else Fore.YELLOW + "摄像头预热超时") + Fore.RESET +
+            f"\t{elapsed * 1000:.0f}ms\t{frames}帧"
+        )
 
     def checkWlan(self):
         """
@@ -172,6 +186,15 @@ class MainSystem:
                     Fore.CYAN + "图传" + Fore.RESET
                 )
 
+                # 图传在独立的进程中，这里只等待开关切回任务模式
+                if self.background_stream:
+                    self.oled.clear()
+                    self.oled.text("后台图传模式", (1, 1))
+                    self.oled.display()
+                    while self.switch.read_status():
+                        time.sleep(0.05)
+                    continue
+
                 # 检查sender
                 if self.sender_debug is None:
                     printLog(Fore.RED + "没有设置图传发送器对象" + Fore.RESET)
@@ -222,12 +245,14 @@ class MainSystem:
                 else:
                     raise TypeError("不支持的图传发送器类型")
 
+                self.switch_profile(None)
                 while self.ori_imgTrans_running_flag:
                     _, img = self.cap.read()
 
                     # 检查开关
                     if not self.switch.read_status():
                         # 开关状态2，关闭图传
+                        self.cap.release_frame(img)
                         self.ori_imgTrans_running_flag = False
                         break
 
@@ -271,6 +296,9 @@ class MainSystem:
                                     break
                     except BlockingIOError as e:
                         printLog(Fore.RED + f"图传发送失败，稍后重试: {e}" + Fore.RESET)
+                    finally:
+                        # 发送成功、失败或者重连都要归还，否则每次重连都会少一块缓冲
+                        self.cap.release_frame(img)
                     # 检查开关
                     if not self.switch.read_status():
                         # 开关状态2，关闭图传
@@ -296,8 +324,6 @@ class MainSystem:
 
                 # 开始任务
                 while self.task_running_flag:
-                    # 读取空帧的次数
-                    self.read_empty_frame_num = 0
                     # 丢图数置零
                     self.missed_frames = 0
                     # 读取串口信号
@@ -327,8 +353,16 @@ class MainSystem:
                             printLog(Fore.WHITE + f"收到信号 {sign}" + Fore.RESET)
                             self.detecting_LED.on()
 
+                        # 物料跟踪只在同一个任务的连续帧之间有效，每个任务开始时重新捕获
+                        if sign is not None and self.solution.material_tracker is not None:
+                            self.solution.material_tracker.reset()
                         if sign == "1":
-                            self.solution.position_id_stack = []
+                            self.solution.reset_material_tracking()
+                        elif sign == "4":
+                            self.solution.annulus_circle_detector.reset_tracking()
+
+                        # 切换到任务对应的采集配置
+                        self.switch_profile(sign)
 
                         t0 = time.perf_counter()
 
@@ -338,13 +372,21 @@ class MainSystem:
                             if img is None:
                                 continue
 
+                            # 追踪这一帧从采集到串口发送的延迟
+                            self.solution.attach_trace(self.cap.last_trace)
                             res, res_img = self.TASK_DICT[sign](img)
+                            self.cap.release_frame(img)
 
                             if sign is None:
                                 if self.switch.read_status():
                                     self.task_running_flag = False
                                 break
 
+                            # 帧总线上的帧在识别过程中被采集进程覆盖了，结果作废
+                            if isinstance(self.cap, FrameBusReader) and not self.cap.valid():
+                                self.missed_frames += 1
+                                continue
+
                             # 如果有识别结果
                             if res:
                                 # 计算丢图率
@@ -412,6 +454,9 @@ class MainSystem:
                                 # 清空缓冲区的时候结果为1，这个结果不发送
                                 if res != "1":
                                     self.solution.uart.write(res)
+                                    trace = self.solution.trace
+                                    if trace is not None and trace.finished:
+                                        printLog(Fore.WHITE + "latency:" + Fore.RESET + f"{trace}")
 
                                 # 关闭识别指示灯
                                 self.detecting_LED.off()
@@ -425,25 +470,47 @@ class MainSystem:
 
     def updateConfig(self):
         """
-        更新配置，此方法会更新图传发送器的ip和摄像头底部裁剪的高度
+        更新配置，此方法会更新图传发送器的ip、摄像头底部裁剪的高度和抽帧间隔
         """
         self.solution.load_config()
         # 更新裁剪参数
         self.cap.NEED2CUT = self.solution.NEED2CUT
+        # 识别比摄像头慢的时候每N帧处理一帧，跳过的帧不解码
+        self.cap.process_every = max(1, self.solution.PROCESS_EVERY)
         # 更新客户端ip
         if isinstance(self.sender_debug, SendImgUDP):
             self.sender_debug.clients_ip = self.solution.clientsIp_debug
 
+    def switch_profile(self, sign:str|None):
+        """
+        切换到任务对应的采集配置，并同步坐标变换给识别
+        ----
+        分辨率和帧率没有变化时只更新裁剪和解码方式，不会重新打开摄像头
+
+        Args:
+            sign (str): 任务编号，None表示使用默认配置
+        """
+        profile = self.solution.task_profile(sign)
+        if profile is not None and self.cap.apply_profile(profile):
+            printLog(f"采集配置切换 {profile}")
+        self.solution.frame_transform = self.cap.frame_transform
+        # 画面可能变了，光照归一化的增益重新计算
+        self.solution.traditional_color_detector.reset_normalize()
+
     def clear_img_buffer(self, img:cv2.typing.MatLike):
         """
         去除缓冲区图像
         ----
+        抓帧线程只保留最新的一帧，跳过一帧，等到调用之后采集的新帧即可丢弃旧画面
+
         Args:
             img (cv2.typing.MatLike): 图像数据
         Returns:
             res (str): 返回值，完成清除缓冲区操作的信号
             img (cv2.typing.MatLike): 图像数据，读出来的图像数据
         """
+        # 帧可能是共享内存上的只读视图或帧池中的缓冲，画在拷贝上
+        img = img.copy()
         cv2.putText(
             img,
             "Cleaning Buffer...",
@@ -452,13 +519,43 @@ class MainSystem:
             1,
             (0, 0, 255),
         )
-        res = None
-        self.read_empty_frame_num += 1
-        if self.read_empty_frame_num > 30:
-            res = "1"
+        res = "1" if self.cap.skip(1) else None
         return res, img
 
 
+def stream_worker(bus_name:str, config_path:str, stop_event):
+    """
+    后台图传进程
+    ----
+    从帧总线读取帧并通过UDP发送，不受识别速度影响
+
+    Args:
+        bus_name (str): 帧总线名称
+        config_path (str): 配置文件路径，用于读取图传客户端ip
+        stop_event (multiprocessing.Event): 停止信号
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f) if config_path.endswith("json") else yaml.safe_load(f)
+    sender = SendImgUDP("eth0", 4444)
+    sender.clients_ip = config.get("clientsIp_debug", [])
+
+    # 等待客户端连接请求的线程，不阻塞发送
+    def _accept():
+        while not stop_event.is_set():
+            sender.connecting()
+    threading.Thread(target=_accept, daemon=True).start()
+
+    reader = FrameBusReader(bus_name)
+    try:
+        while not stop_event.is_set():
+            ret, img = reader.read()
+            if ret:
+                sender.send(img)
+    finally:
+        reader.release()
+        sender.close()
+
+
 if __name__ == "__main__":
     # region 获取命令行参数deal_method
     parser = argparse.ArgumentParser(description="MainSystem")
@@ -468,12 +565,50 @@ if __name__ == "__main__":
         default="config.yaml",
         help="配置文件路径",
     )
+    parser.add_argument(
+        "-r", "--replay",
+        type=str,
+        default=None,
+        help="回放的视频文件或图片文件夹，不设置则使用摄像头",
+    )
+    parser.add_argument(
+        "-p", "--pacing",
+        type=str,
+        default="realtime",
+        choices=ReplayCap.PACING_MODES,
+        help="回放的节奏模式",
+    )
+    parser.add_argument(
+        "-b", "--bus",
+        action="store_true",
+        help="采集、识别和图传分别在独立的进程中运行，通过共享内存帧总线传递帧",
+    )
+    parser.add_argument(
+        "--record",
+        type=str,
+        default=None,
+        help="帧总线模式下把采集到的帧录成视频，可以用--replay回放",
+    )
     args = parser.parse_args()
     config_path = args.config_path
     # endregion
 
-    # 设置图传发送器
-    sender_wired = SendImgUDP("eth0", 4444)
+    cap = ReplayCap(args.replay, args.pacing, loop=True) if args.replay else None
+
+    # 帧总线模式，启动采集、图传和录像进程
+    stop_event = multiprocessing.Event()
+    workers:list[multiprocessing.Process] = []
+    if args.bus:
+        workers.append(multiprocessing.Process(target=run_capture, args=(BUS_NAME, stop_event), daemon=True))
+        workers.append(multiprocessing.Process(target=stream_worker, args=(BUS_NAME, config_path, stop_event), daemon=True))
+        if args.record:
+            workers.append(multiprocessing.Process(target=run_recorder, args=(BUS_NAME, args.record, stop_event), daemon=True))
+        for worker in workers:
+            worker.start()
+        cap = FrameBusReader(BUS_NAME)
+
+    # 设置图传发送器，帧总线模式下由图传进程发送
+    sender_wired = None if args.bus else SendImgUDP("eth0", 4444)
 
     mainsystem = MainSystem(
         ser_port="/dev/ttyS3",
@@ -481,6 +616,8 @@ if __name__ == "__main__":
         pgkTAIL="#",
         sender_debug=sender_wired,
         config_path=config_path,
+        cap=cap,
+        background_stream=args.bus,
     )
 
     try:
@@ -488,4 +625,8 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         printLog(Fore.RED + "程序被中断（用户终止）" + Fore.RESET)
         mainsystem.start_LED.off()
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=2)
 # end main
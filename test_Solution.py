@@ -43,7 +43,7 @@ from datetime import datetime
 import cv2
 import numpy as np
 from Solution import Solution
-from utils import LoadCap, Cap, InterpolatedCap
+from utils import LoadCap, Cap, InterpolatedCap, ThreadedCap, ReplayCap, LensCalibration
 from ImgTrans import ReceiveImgUDP, SendImg, ReceiveImg
 from colorama import Fore, Style, init
 
@@ -79,7 +79,7 @@ class Test_solution(Solution):
         else:
             self.sender = None
 
-    def test_func(self, cap:Cap|ReceiveImg, sign: str):
+    def test_func(self, cap:Cap|ReceiveImg|ReplayCap, sign: str):
         """
         测试Solution顶层功能
         ----
@@ -87,6 +87,8 @@ class Test_solution(Solution):
         * "3": 物料运动检测
         * "4": 获取物料位号
 
+        回放源播放完之后退出，并打印识别耗时的统计
+
         Args:
             cap (Cap): 摄像头对象
             sign (str): 串口信号(功能编号)
@@ -94,9 +96,12 @@ class Test_solution(Solution):
             None
         """
         # cv2.namedWindow("img", cv2.WINDOW_NORMAL)
+        detect_times = []
         while True:
             _,img = cap.read()
             if img is None:
+                if isinstance(cap, ReplayCap) and cap.finished:
+                    break
                 continue
 
             img = img[:400,:]
@@ -106,6 +111,7 @@ class Test_solution(Solution):
             t1 = time.perf_counter()
 
             detect_time = t1 - t0
+            detect_times.append(detect_time)
 
             if self.sender is not None:
                 self.sender.send(res_img)
@@ -152,6 +158,13 @@ class Test_solution(Solution):
             #     if cv2.waitKey(1) & 0xFF == ord("q"):
             #         break
 
+        if detect_times:
+            print(
+                Fore.CYAN + f"frames: {len(detect_times)}" + Style.RESET_ALL,
+                f"mean(ms): {np.mean(detect_times) * 1000:.2f}",
+                f"max(ms): {np.max(detect_times) * 1000:.2f}",
+            )
+
     def test_usart_read(self, head: str, tail: str):
         """
         测试读取串口
@@ -209,9 +222,8 @@ class Test_solution(Solution):
 
         mask_lst = []   # 用于测试
 
-        for color in COLOR_DIC.values():
-            self.traditional_color_detector.update_threshold(color)
-            binarization_img=self.traditional_color_detector.binarization(img_sharpen)
+        masks = self.traditional_color_detector.binarization_multi(img_sharpen, tuple(COLOR_DIC.values()))
+        for color, binarization_img in masks.items():
             center_point = self.traditional_color_detector.get_color_position(binarization_img)
 
             # region 用于测试
@@ -287,9 +299,33 @@ class Test_solution(Solution):
 
         cap.release()
 
+def test_output_point_edge_pixel(tmp_path):
+    """
+    测试画面边缘的点
+    ----
+    畸变校正之后画面角上的点为负数，发给电控的坐标要限制在0~999，保证串口协议中的3位数字
+    """
+    solution = Solution(None, "config.yaml")
+    solution.frame_transform = (0, 0, 1)
+    solution.coord_output = "pixel"
+    solution.ground = None
+    solution.lens = LensCalibration(
+        [[300, 0, 160], [0, 300, 120], [0, 0, 1]], [-0.4, 0.1, 0, 0, 0], (320, 240), 0.0, str(tmp_path)
+    )
+    # 校正之后左上角在画面外
+    assert min(solution.lens.undistort_point((0, 0))) < 0
+    for point in ((0, 0), (319, 0), (0, 239), (319, 239)):
+        x, y = solution.output_point(point)
+        assert isinstance(x, int) and isinstance(y, int)
+        assert 0 <= x <= 999 and 0 <= y <= 999
+    assert solution.output_point((0, 0)) == (0, 0)
+
+
 if __name__ == "__main__":
     sender = SendImg("169.254.60.115", 4444)
-    cap = Cap()
+    cap = ThreadedCap()
+    # 离线回放录像
+    # cap = ReplayCap("record.avi", pacing="fast")
     test = Test_solution(sender=sender)
     test.test_func(cap, "2")
     # test.test_material_positions(0)
@@ -52,6 +52,7 @@ Usart类
 """
 from typing import Union, overload
 from utils.typingCheck import check_args
+from utils.trace import Trace
 import serial
 
 
@@ -74,6 +75,10 @@ class Uart(serial.Serial):
         """
         super().__init__(port=port, baudrate=baudrate, timeout=timeout)
         self.read_falg = True
+        # 当前结果对应帧的延迟追踪，发送之后结束追踪
+        self.trace:Trace|None = None
+        # 追踪时是否等数据真正发出去再结束计时，flush会阻塞主循环，只在需要测量串口发送耗时时打开
+        self.flush_on_trace:bool = False
 
 
     def new_read(self, head: str, tail: str = "\n") -> str|None:
@@ -132,6 +137,10 @@ class Uart(serial.Serial):
             head (Union[str, bytes]): 包头，默认为空字符串或空字节串
             tail (Union[str, bytes]): 包尾，默认为空字符串或空字节串
         """
+        trace, self.trace = self.trace, None
+        if trace is not None:
+            trace.stamp("uart_start")
+
         if check_args(
             (data, str),
             (head, str),
@@ -160,6 +169,13 @@ class Uart(serial.Serial):
         else:
             raise TypeError("Invalid data type")
 
+        if trace is not None:
+            # 默认在write返回时结束计时，不改变串口的发送行为
+            if self.flush_on_trace:
+                super().flush()
+            trace.stamp("uart_end")
+            trace.finish()
+
 
     def clear(self):
         """
@@ -14,7 +14,10 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
-from ._cap import InterpolatedCap, LoadCap, Cap
+from ._cap import InterpolatedCap, LoadCap, Cap, ThreadedCap, FramePool, ReplayCap, MultiCap
+from .trace import Trace, TraceRecorder, traced
+from .frame_bus import FrameBusWriter, FrameBusReader
+from .calibration import LensCalibration, GroundPlane
 from .UART import Uart
 from .typingCheck import check_args
 from .gpio import Switch, OLED_I2C, LED
@@ -27,6 +30,17 @@ __all__ = [
     "Cap",
     "InterpolatedCap",
     "LoadCap",
+    "ThreadedCap",
+    "FramePool",
+    "ReplayCap",
+    "MultiCap",
+    "Trace",
+    "TraceRecorder",
+    "traced",
+    "FrameBusWriter",
+    "FrameBusReader",
+    "LensCalibration",
+    "GroundPlane",
     "Uart",
     "check_args",
     "Switch",
@@ -14,15 +14,213 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import json
+import os
+import threading
+import time
 import cv2
+import numpy as np
 from collections import deque
 import subprocess
 import re
+from .trace import Trace
+
+
+def crop_frame(frame, crop, detect_height: int, scale: int = 1):
+    """
+    裁剪识别区域
+    ----
+    Args:
+        frame (cv2.typing.MatLike): 图像
+        crop (list|None): 裁剪矩形 [[x0, y0], [x1, y1]]，None时只裁掉底部区域
+        detect_height (int): 不设置裁剪矩形时保留的高度
+        scale (int): 图像相对采集分辨率的缩小倍数
+    Returns:
+        cv2.typing.MatLike: 裁剪之后的视图
+    """
+    if crop is None:
+        return frame[0:detect_height // scale, :]
+    (x0, y0), (x1, y1) = crop
+    return frame[y0 // scale:y1 // scale, x0 // scale:x1 // scale]
+
+
+class FramePool:
+    """
+    预分配帧缓冲池
+    ----
+    * 按(形状, 数据类型)回收图像数组，避免每一帧都重新申请内存
+    * 消费者用完帧之后调用 `release` 归还，下一次解码直接写进归还的数组
+    * 统计命中(复用了缓冲)和未命中(新申请了缓冲)的次数
+    """
+
+    def __init__(self, max_size: int = 4) -> None:
+        """
+        初始化
+        ----
+        Args:
+            max_size (int): 每种形状最多缓存的空闲数组个数
+        """
+        self.max_size = max_size
+        self.hits:int = 0  # 复用缓冲的次数
+        self.misses:int = 0  # 新申请缓冲的次数
+        self._free:dict[tuple, list[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(shape, dtype) -> tuple:
+        return tuple(shape), np.dtype(dtype).str
+
+    def preallocate(self, shape: tuple, n: int, dtype=np.uint8):
+        """
+        预先申请n个缓冲
+        ----
+        Args:
+            shape (tuple): 数组形状
+            n (int): 个数
+            dtype: 数据类型
+        """
+        for _ in range(n):
+            self.release(np.empty(shape, dtype))
+
+    def acquire(self, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        """
+        取出一个缓冲，缓冲池为空的时候新申请
+        ----
+        Args:
+            shape (tuple): 数组形状
+            dtype: 数据类型
+        Returns:
+            np.ndarray: 缓冲数组，内容未初始化
+        """
+        with self._lock:
+            free = self._free.get(self._key(shape, dtype))
+            if free:
+                self.hits += 1
+                return free.pop()
+            self.misses += 1
+        return np.empty(shape, dtype)
+
+    def release(self, frame: np.ndarray):
+        """
+        归还缓冲
+        ----
+        传入裁剪后的视图也可以，会归还视图所属的整块数组；归还之后不能再使用这一帧
+
+        Args:
+            frame (np.ndarray): 用完的帧
+        """
+        root = frame
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        with self._lock:
+            free = self._free.setdefault(self._key(root.shape, root.dtype), [])
+            if len(free) < self.max_size and not any(buf is root for buf in free):
+                free.append(root)
 
 
 class Cap(cv2.VideoCapture):
+    # 摄像头在v4l2中的设备名
+    CAM_NAME:str = "LRCP 1080P-60"
+    SYSFS_V4L:str = "/sys/class/video4linux"
+    # video节点编号的缓存文件，以摄像头的USB路径为键
+    INDEX_CACHE_PATH:str = os.path.join(os.path.expanduser("~"), ".cache", "eic_vision", "cap_index.json")
+    # 进程内缓存，{USB路径: [video节点编号]}
+    _index_cache:dict[str, list[str]] = {}
+
     @staticmethod
-    def getCapIndex():
+    def _read_sysfs(path: str) -> str | None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _usb_path(node: str) -> str | None:
+        """
+        获取video节点所属的USB路径，例如"1-1.2"
+        ----
+        Args:
+            node (str): 节点名，例如"video1"
+        """
+        device = os.path.realpath(os.path.join(Cap.SYSFS_V4L, node, "device"))
+        if not os.path.exists(device):
+            return None
+        # device指向USB接口目录，例如 .../usb1/1-1/1-1:1.0
+        return os.path.basename(device).split(":")[0]
+
+    @staticmethod
+    def scanSysfs(name: str | None = None) -> dict[str, list[str]]:
+        """
+        扫描sysfs，查找设备名匹配的video节点
+        ----
+        Args:
+            name (str): 设备名，默认使用 `CAM_NAME`
+        Returns:
+            dict: {USB路径: [video节点编号]}，同一个摄像头的节点按采集节点在前排序
+        """
+        name = name or Cap.CAM_NAME
+        groups:dict[str, list[tuple[int, int]]] = {}
+        try:
+            nodes = os.listdir(Cap.SYSFS_V4L)
+        except OSError:
+            return {}
+        for node in nodes:
+            if not node.startswith("video") or not node[5:].isdigit():
+                continue
+            dev_name = Cap._read_sysfs(os.path.join(Cap.SYSFS_V4L, node, "name"))
+            if dev_name is None or name not in dev_name:
+                continue
+            usb_path = Cap._usb_path(node) or node
+            # index为0的是采集节点，其余是元数据节点
+            index = Cap._read_sysfs(os.path.join(Cap.SYSFS_V4L, node, "index"))
+            groups.setdefault(usb_path, []).append(
+                (int(index) if index and index.isdigit() else 0, int(node[5:]))
+            )
+        return {
+            usb_path: [str(num) for _, num in sorted(items)]
+            for usb_path, items in groups.items()
+        }
+
+    @staticmethod
+    def _index_valid(usb_path: str, nums: list[str]) -> bool:
+        """
+        检查缓存的节点是否还属于同一个USB路径上的摄像头
+        """
+        for num in nums:
+            node = f"video{num}"
+            dev_name = Cap._read_sysfs(os.path.join(Cap.SYSFS_V4L, node, "name"))
+            if dev_name is None or Cap.CAM_NAME not in dev_name:
+                return False
+            if (Cap._usb_path(node) or node) != usb_path:
+                return False
+        return bool(nums)
+
+    @staticmethod
+    def _load_index_cache() -> dict[str, list[str]]:
+        try:
+            with open(Cap.INDEX_CACHE_PATH, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_index_cache(cache: dict[str, list[str]]):
+        try:
+            os.makedirs(os.path.dirname(Cap.INDEX_CACHE_PATH), exist_ok=True)
+            with open(Cap.INDEX_CACHE_PATH, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+        except OSError:
+            pass
+
+    @staticmethod
+    def getCapIndexV4l2():
+        """
+        使用v4l2-ctl查找摄像头的video节点编号
+        ----
+        需要启动子进程，比较慢，只在sysfs中找不到的时候使用
+        """
         try:
             result = subprocess.run(['v4l2-ctl', '--list-devices'], capture_output=True, text=True, check=True)
             pattern = r"LRCP 1080P-60.*?\n\s*(/dev/video\d+)\n\s*(/dev/video\d+)"
@@ -33,12 +231,70 @@ class Cap(cv2.VideoCapture):
                 video1_num = re.search(r'\d+', video1).group()
                 video2_num = re.search(r'\d+', video2).group()
                 return video1_num, video2_num
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
             print(f"Error occurred: {e}")
             return None
 
+    @staticmethod
+    def getCapIndex():
+        """
+        查找摄像头的video节点编号
+        ----
+        依次使用进程内缓存、缓存文件、扫描sysfs，都找不到的时候才调用v4l2-ctl
+
+        Returns:
+            tuple[str, ...]|None: video节点编号，采集节点在前
+        """
+        cache = Cap._index_cache or Cap._load_index_cache()
+        for usb_path, nums in cache.items():
+            if Cap._index_valid(usb_path, nums):
+                Cap._index_cache = {usb_path: nums}
+                return tuple(nums)
+
+        groups = Cap.scanSysfs()
+        if groups:
+            usb_path = sorted(groups)[0]
+            Cap._index_cache = {usb_path: groups[usb_path]}
+            Cap._save_index_cache(groups)
+            return tuple(groups[usb_path])
+
+        return Cap.getCapIndexV4l2()
+
+    @staticmethod
+    def getCaptureIndexes() -> list[int]:
+        """
+        查找所有摄像头的采集节点编号
+        ----
+        UVC摄像头每个都有采集节点和元数据节点，元数据节点(sysfs中index不为0)不会输出图像，这里只返回采集节点
+
+        Returns:
+            list[int]: 采集节点编号，sysfs中找不到时使用 `getCapIndex` 的第一个节点
+        """
+        nums = []
+        for _, group in sorted(Cap.scanSysfs().items()):
+            for num in group:
+                index = Cap._read_sysfs(os.path.join(Cap.SYSFS_V4L, f"video{num}", "index"))
+                if not index or not index.isdigit() or int(index) == 0:
+                    nums.append(int(num))
+        if nums:
+            return nums
+        caps = Cap.getCapIndex()
+        return [int(caps[0])] if caps else [0]
+
     # 识别的时候需要裁剪掉的底部区域高度(px)
     NEED2CUT:int = 40
+    # 每N帧处理一帧，其余的帧只grab不解码
+    process_every:int = 1
+
+    # 解码模式: (imdecode的标志, 缩小倍数)
+    DECODE_MODES:dict[str, tuple[int, int]] = {
+        "bgr": (cv2.IMREAD_COLOR, 1),
+        "bgr_half": (cv2.IMREAD_REDUCED_COLOR_2, 2),
+        "bgr_quarter": (cv2.IMREAD_REDUCED_COLOR_4, 4),
+        "gray": (cv2.IMREAD_GRAYSCALE, 1),
+        "gray_half": (cv2.IMREAD_REDUCED_GRAYSCALE_2, 2),
+        "gray_quarter": (cv2.IMREAD_REDUCED_GRAYSCALE_4, 4),
+    }
 
     @property
     def DETECT_HEIGHT(self):
@@ -48,7 +304,30 @@ class Cap(cv2.VideoCapture):
         res = self.height - self.NEED2CUT
         return res if res > 0 else self.height
 
-    def __init__(self, _id: int|None = None, w: int = 320, h: int = 240, fps: int = 60) -> None:
+    def __init__(
+        self,
+        _id: int|None = None,
+        w: int = 320,
+        h: int = 240,
+        fps: int = 60,
+        pool: FramePool|None = None,
+        raw: bool = False,
+        decode_mode: str = "bgr"
+    ) -> None:
+        """
+        初始化
+        ----
+        Args:
+            _id (int): 摄像头编号，None时自动查找
+            w (int): 宽
+            h (int): 高
+            fps (int): 帧率
+            pool (FramePool): 帧缓冲池，设置之后解码的帧会写入池中回收的数组
+            raw (bool): 是否直接取出MJPG压缩数据，由消费者按需解码
+            decode_mode (str): raw模式下 `read` 使用的解码模式，见 `DECODE_MODES`
+        """
+        if decode_mode not in self.DECODE_MODES:
+            raise ValueError(f"argument decode_mode must be one of {list(self.DECODE_MODES)}")
         if _id is None:
             caps = Cap.getCapIndex()
             if caps:
@@ -57,26 +336,285 @@ class Cap(cv2.VideoCapture):
                 _id = 0
         self.width = w
         self.height = h
+        self.fps = fps
+        # 裁剪矩形 [[x0, y0], [x1, y1]]，None时只裁掉底部NEED2CUT
+        self.crop: list | None = None
+        self.pool = pool
+        self.raw = raw
+        self.decode_mode = decode_mode
+        self._frame_shape: tuple|None = None  # 解码出来的完整帧的形状
+        self.last_trace: Trace|None = None  # 上一次read得到的帧的延迟追踪
         super().__init__(_id)
         self.set(3, w)
         self.set(4, h)
         self.set(5, fps)
         self.set(6, cv2.VideoWriter.fourcc("M", "J", "P", "G"))
         self.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if raw:
+            # 不让OpenCV解码，read得到的是MJPG压缩数据
+            self.set(cv2.CAP_PROP_CONVERT_RGB, 0)
 
     def read(self, image: cv2.typing.MatLike | None = None):
         """
         读取摄像头数据
         ----
+        Args:
+            image (cv2.typing.MatLike): 解码的目标数组，形状匹配时直接写入，不再申请新内存；
+                不传并且设置了缓冲池时从缓冲池中取
         Returns:
             tuple: (ret, frame)
         """
-        ret, frame = super().read()
+        ret, frame, trace = self._capture(image)
+        trace.stamp("read")
+        self.last_trace = trace
+        return ret, frame
+
+    def _capture(self, image: cv2.typing.MatLike | None = None):
+        """
+        取帧并解码，同时记录取帧和解码完成的时间
+        ----
+        Returns:
+            tuple: (ret, frame, trace)
+        """
+        trace = Trace()
+        if self.raw:
+            ret, buf = self.read_raw()
+            trace.stamp("grab")
+            frame = self.decode(buf) if ret else None
+            trace.stamp("decoded")
+            return frame is not None, frame, trace
+
+        # 抽帧，跳过的帧不解码
+        if self.process_every > 1:
+            self._grab_only(self.process_every - 1)
+
+        # 只有从缓冲池取出的缓冲才能放回去，调用者传入的数组不属于缓冲池
+        pooled = image is None and self.pool is not None and self._frame_shape is not None
+        if pooled:
+            image = self.pool.acquire(self._frame_shape)
+
+        # 分开grab和retrieve，区分等帧和解码的时间
+        ret = self.grab()
+        trace.stamp("grab")
+        frame = None
+        if ret:
+            if image is not None:
+                ret, frame = self.retrieve(image)
+            else:
+                ret, frame = self.retrieve()
+        trace.stamp("decoded")
+
+        # 解码没有用上取出的缓冲，放回缓冲池
+        if pooled and (not ret or frame is not image):
+            self.pool.release(image)
+
         if ret:
-            # 裁剪底部区域
-            frame = frame[0:self.DETECT_HEIGHT, :]
-            return ret, frame
-        return ret, None
+            self._frame_shape = frame.shape
+            # 裁剪识别区域
+            frame = crop_frame(frame, self.crop, self.DETECT_HEIGHT)
+            return ret, frame, trace
+        return ret, None, trace
+
+    def read_raw(self):
+        """
+        读取没有解码的MJPG数据
+        ----
+        需要以raw模式初始化，否则后端可能已经解码，`decode` 会兼容这种情况
+
+        Returns:
+            tuple: (ret, buf)
+        """
+        if self.process_every > 1:
+            self._grab_only(self.process_every - 1)
+        ret, buf = super().read()
+        return ret, buf if ret else None
+
+    def decode(self, buf: cv2.typing.MatLike, mode: str | None = None):
+        """
+        按解码模式解码并裁剪底部区域
+        ----
+        缩小和灰度解码由libjpeg在解码时完成，只解出需要的像素
+
+        Args:
+            buf (cv2.typing.MatLike): `read_raw` 得到的数据
+            mode (str): 解码模式，见 `DECODE_MODES`，默认使用 `decode_mode`
+        Returns:
+            frame (cv2.typing.MatLike|None): 解码之后的图像，解码失败返回None
+        """
+        flag, scale = self.DECODE_MODES[mode or self.decode_mode]
+        if buf.ndim == 1 or (buf.ndim == 2 and buf.shape[0] == 1):
+            frame = cv2.imdecode(buf, flag)
+            if frame is None:
+                return None
+        else:
+            # 后端已经解码，只能在解码后转换
+            frame = buf
+            gray = flag in (cv2.IMREAD_GRAYSCALE, cv2.IMREAD_REDUCED_GRAYSCALE_2, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+            if gray and frame.ndim == 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            elif not gray and frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            if scale > 1:
+                frame = cv2.resize(
+                    frame,
+                    (frame.shape[1] // scale, frame.shape[0] // scale),
+                    interpolation=cv2.INTER_AREA
+                )
+        # 裁剪识别区域，按缩小倍数换算
+        return crop_frame(frame, self.crop, self.DETECT_HEIGHT, scale)
+
+    @property
+    def frame_transform(self) -> tuple[int, int, int]:
+        """
+        读出的图像坐标到采集画面坐标的变换 (x0, y0, scale)
+        ----
+        采集画面坐标 = 图像坐标 * scale + (x0, y0)
+        """
+        scale = self.DECODE_MODES[self.decode_mode][1] if self.raw else 1
+        if self.crop is None:
+            return 0, 0, scale
+        return self.crop[0][0], self.crop[0][1], scale
+
+    def apply_profile(self, profile: dict | None) -> bool:
+        """
+        切换采集配置
+        ----
+        只设置和当前不同的项：分辨率和帧率需要重启视频流，裁剪和解码模式只在软件中处理，切换没有开销。
+        解码模式只在raw模式下生效。
+
+        Args:
+            profile (dict): 采集配置，例如
+                {"width": 320, "height": 240, "fps": 60, "crop": [[0, 0], [320, 200]], "decode": "bgr"}，
+                没有写宽高和帧率时保持不变，没有写裁剪矩形时只裁掉底部，没有写解码模式时使用bgr
+        Returns:
+            bool: 配置是否有变化
+        """
+        if not profile:
+            return False
+        changed = False
+        w = profile.get("width", self.width)
+        h = profile.get("height", self.height)
+        fps = profile.get("fps", self.fps)
+        if (w, h) != (self.width, self.height):
+            self.set(3, w)
+            self.set(4, h)
+            self.width, self.height = w, h
+            changed = True
+        if fps != self.fps:
+            self.set(5, fps)
+            self.fps = fps
+            changed = True
+
+        crop = profile.get("crop")
+        decode_mode = profile.get("decode", "bgr")
+        if decode_mode not in self.DECODE_MODES:
+            raise ValueError(f"decode mode must be one of {list(self.DECODE_MODES)}")
+        if crop != self.crop or decode_mode != self.decode_mode:
+            self.crop = crop
+            self.decode_mode = decode_mode
+            changed = True
+        return changed
+
+    def _grab_only(self, n: int) -> int:
+        """
+        只grab不retrieve，丢弃的帧不会被解码
+        ----
+        Args:
+            n (int): 丢弃的帧数
+        Returns:
+            int: 实际丢弃的帧数
+        """
+        skipped = 0
+        for _ in range(n):
+            if not self.grab():
+                break
+            skipped += 1
+        return skipped
+
+    def skip(self, n: int, timeout: float = 1.0) -> int:
+        """
+        跳过n帧
+        ----
+        用于清空驱动缓冲区，跳过的帧不解码
+
+        Args:
+            n (int): 跳过的帧数
+            timeout (float): 超时时间(s)，每次grab之前检查，超时之后不再跳过
+        Returns:
+            int: 实际跳过的帧数
+        """
+        deadline = time.perf_counter() + timeout
+        skipped = 0
+        while skipped < n and time.perf_counter() < deadline:
+            if not self.grab():
+                break
+            skipped += 1
+        return skipped
+
+    def release_frame(self, frame: cv2.typing.MatLike | None):
+        """
+        归还用完的帧
+        ----
+        没有设置缓冲池的时候什么都不做；归还之后不能再使用这一帧
+
+        Args:
+            frame (cv2.typing.MatLike): `read` 得到的帧
+        """
+        if self.pool is not None and frame is not None:
+            self.pool.release(frame)
+
+    def _read_new(self):
+        """
+        读取一帧新帧，预热时使用
+        """
+        return self.read()
+
+    def warm_up(
+        self,
+        timeout: float = 3.0,
+        brightness_tol: float = 1.5,
+        diff_tol: float = 2.0,
+        stable_frames: int = 5
+    ) -> tuple[bool, float, int]:
+        """
+        等待摄像头预热完成
+        ----
+        自动曝光调整时画面亮度一直在变，连续 `stable_frames` 帧的亮度变化和帧间差异都小于阈值时认为曝光已经收敛。
+        亮度和差异在降采样的灰度上计算，单位为灰度值(0~255)
+
+        Args:
+            timeout (float): 最长等待时间(s)
+            brightness_tol (float): 相邻两帧平均亮度变化的阈值
+            diff_tol (float): 相邻两帧平均像素差异的阈值
+            stable_frames (int): 需要连续稳定的帧数
+        Returns:
+            tuple: (是否收敛, 用时(s), 读取的帧数)
+        """
+        start = time.perf_counter()
+        prev = None
+        prev_brightness = 0.0
+        stable = 0
+        frames = 0
+        while time.perf_counter() - start < timeout:
+            ret, frame = self._read_new()
+            if not ret or frame is None:
+                continue
+            frames += 1
+            small = frame[::8, ::8]
+            gray = small.mean(axis=2) if small.ndim == 3 else small.astype(np.float32)
+            self.release_frame(frame)
+
+            brightness = float(gray.mean())
+            if prev is not None and prev.shape == gray.shape:
+                diff = float(np.abs(gray - prev).mean())
+                if abs(brightness - prev_brightness) < brightness_tol and diff < diff_tol:
+                    stable += 1
+                    if stable >= stable_frames:
+                        return True, time.perf_counter() - start, frames
+                else:
+                    stable = 0
+            prev, prev_brightness = gray, brightness
+        return False, time.perf_counter() - start, frames
 
 
 class LoadCap:
@@ -86,12 +624,14 @@ class LoadCap:
         ----
         Args:
             _id (int):摄像头编号
-            cap_method (str):摄像头的方法，包括'opencv'和'interpolated'
+            cap_method (str):摄像头的方法，包括'opencv'、'interpolated'和'threaded'
         """
-        if cap_method not in ["opencv", "interpolated"]:
-            raise ValueError("argument cap_method must is opencv or interpolated")
+        if cap_method not in ["opencv", "interpolated", "threaded"]:
+            raise ValueError("argument cap_method must is opencv, interpolated or threaded")
         if cap_method == "opencv":
             self.cap = Cap(_id)
+        elif cap_method == "threaded":
+            self.cap = ThreadedCap(_id)
         else:
             self.cap = InterpolatedCap(_id)
 
@@ -120,19 +660,59 @@ class LoadCap:
 
 class InterpolatedCap(Cap):
     """
-    运用插值补帧方法的Cap类
+    运用插值补帧和时域降噪的Cap类
+    ----
+    滤波模式:
+    * "blend": 当前帧和上一帧按alpha加权混合
+    * "ema": 指数平滑，累加器 acc = alpha * frame + (1 - alpha) * acc
+    * "average": 最近max_average帧的滑动平均，环形缓冲保存最近的帧，累加器为这些帧的和
+
+    * 所有缓冲都是预分配的，滤波在原地完成，返回的帧在下一次读取时会被覆盖
+    * 画面中运动的像素比例超过 `motion_ratio` 时清空累加器，避免移动的物料拖影
     """
 
-    def __init__(self, _id: int|None = None) -> None:
-        super().__init__(_id)
-        self.set(3, 640)
-        self.set(4, 480)
-        self.set(5, 100)
-        self.set(6, cv2.VideoWriter.fourcc("M", "J", "P", "G"))
+    FILTER_MODES = ("blend", "ema", "average")
+
+    def __init__(
+        self,
+        _id: int|None = None,
+        pool: FramePool|None = None,
+        w: int = 640,
+        h: int = 480,
+        fps: int = 100,
+        mode: str = "blend",
+        alpha: float = 0.6,
+        max_average: int = 8,
+        motion_threshold: int = 30,
+        motion_ratio: float = 0.02,
+    ) -> None:
+        """
+        初始化
+        ----
+        Args:
+            _id (int): 摄像头编号
+            pool (FramePool): 帧缓冲池
+            w (int): 宽
+            h (int): 高
+            fps (int): 帧率
+            mode (str): 滤波模式，包括'blend'、'ema'和'average'
+            alpha (float): 插值系数，当前帧的权重
+            max_average (int): average模式下参与平均的最大帧数
+            motion_threshold (int): 像素差超过这个值认为这个像素在运动
+            motion_ratio (float): 运动像素比例超过这个值时清空累加器
+        """
+        if mode not in self.FILTER_MODES:
+            raise ValueError("argument mode must is blend, ema or average")
+        super().__init__(_id, w, h, fps, pool)
 
+        self.mode = mode
         self.prev_frame = None
         # 插值系数
-        self.alpha = 0.6
+        self.alpha = alpha
+        self.max_average = max_average
+        self.motion_threshold = motion_threshold
+        self.motion_ratio = motion_ratio
+        self.motion_resets:int = 0  # 运动导致清空累加器的次数
         self.prev_tick = cv2.getTickCount()
         self.frame_count = 0
         # 用于存储最近30帧的FPS值
@@ -140,20 +720,686 @@ class InterpolatedCap(Cap):
         self.avg_fps = 0
         self.interpolated_frame = None
 
-    def read(self):
-        ret, frame = super().read()
+        self._acc: np.ndarray | None = None  # float32累加器，ema模式为平滑结果，average模式为窗口内的帧之和
+        self._acc_count = 0  # 累加器中的帧数
+        self._ring: np.ndarray | None = None  # average模式的环形缓冲，保存窗口内的帧
+        self._ring_pos = 0  # 环形缓冲中下一次写入的位置
+        self._diff: np.ndarray | None = None  # 运动检测的差分缓冲
+
+    def _blend(self, frame):
+        if self.prev_frame is not None and self.prev_frame.shape == frame.shape:
+            if self.interpolated_frame is None or self.interpolated_frame.shape != frame.shape:
+                self.interpolated_frame = np.empty_like(frame)
+            # 使用插值方法生成新帧
+            cv2.addWeighted(
+                frame, self.alpha, self.prev_frame, 1 - self.alpha, 0,
+                dst=self.interpolated_frame
+            )
+            np.copyto(self.prev_frame, frame)
+        else:
+            self.prev_frame = frame.copy()
+
+    def _is_moving(self, frame) -> bool:
+        """
+        当前帧和上一次的滤波结果相比，运动像素的比例是否超过阈值
+        """
+        cv2.absdiff(frame, self.interpolated_frame, dst=self._diff)
+        cv2.threshold(self._diff, self.motion_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        moving = cv2.countNonZero(self._diff.reshape(self._diff.shape[0], -1))
+        return moving > self.motion_ratio * self._diff.size
+
+    def _accumulate(self, frame):
+        if self._acc is None or self._acc.shape != frame.shape:
+            self._acc = np.empty(frame.shape, np.float32)
+            self._diff = np.empty_like(frame)
+            self.interpolated_frame = np.empty_like(frame)
+            self._ring = np.empty((self.max_average,) + frame.shape, frame.dtype) if self.mode == "average" else None
+            self._acc_count = 0
+
+        if self._acc_count and self._is_moving(frame):
+            self.motion_resets += 1
+            self._acc_count = 0
+
+        if self.mode == "average":
+            self._accumulate_window(frame)
+            return
+
+        if self._acc_count == 0:
+            np.copyto(self._acc, frame, casting="unsafe")
+            self._acc_count = 1
+        else:
+            cv2.accumulateWeighted(frame, self._acc, self.alpha)
+        cv2.convertScaleAbs(self._acc, dst=self.interpolated_frame)
+
+    def _accumulate_window(self, frame):
+        """
+        滑动窗口平均
+        ----
+        累加器保存窗口内的帧之和，窗口满了之后减去最早的一帧再加上新帧，每帧只需要一次加减
+        """
+        if self._acc_count == 0:
+            self._acc.fill(0)
+            self._ring_pos = 0
+        if self._acc_count == self.max_average:
+            # 像素值都是整数，float32的加减没有累积误差
+            cv2.subtract(self._acc, self._ring[self._ring_pos], dst=self._acc, dtype=cv2.CV_32F)
+        else:
+            self._acc_count += 1
+        np.copyto(self._ring[self._ring_pos], frame)
+        self._ring_pos = (self._ring_pos + 1) % self.max_average
+        cv2.add(self._acc, frame, dst=self._acc, dtype=cv2.CV_32F)
+        cv2.convertScaleAbs(self._acc, dst=self.interpolated_frame, alpha=1.0 / self._acc_count)
+
+    def read(self, image: cv2.typing.MatLike | None = None):
+        """
+        读取滤波之后的帧
+        ----
+        返回的是预分配的数组，在下一次读取时会被覆盖，需要保留的话自行拷贝
+
+        Returns:
+            tuple: (ret, frame)
+        """
+        ret, frame = super().read(image)
         if ret:
-            if self.prev_frame is not None:
-                # 使用插值方法生成新帧
-                self.interpolated_frame = cv2.addWeighted(
-                    frame, self.alpha, self.prev_frame, 1 - self.alpha, 0
-                )
-            self.prev_frame = frame
+            if self.mode == "blend":
+                self._blend(frame)
+            else:
+                self._accumulate(frame)
 
         if self.interpolated_frame is not None:
+            # 原始帧已经写进了自己的缓冲，从缓冲池取的可以直接归还，调用者传入的数组留给调用者
+            if image is None:
+                super().release_frame(frame)
             return ret, self.interpolated_frame
         return ret, frame
 
+    def release_frame(self, frame: cv2.typing.MatLike | None):
+        # 滤波帧是自己持有的数组，不放进缓冲池
+        if frame is self.interpolated_frame:
+            return
+        super().release_frame(frame)
+
     def release(self):
         super().release()
         cv2.destroyAllWindows()
+
+
+class ThreadedCap(Cap):
+    """
+    后台抓帧的Cap类
+    ----
+    * 后台线程持续读取摄像头，只保留最新的一帧，采集和识别可以并行
+    * `read` 直接返回最新帧，不会阻塞在V4L2的读取和MJPG解码上
+    * 统计丢弃帧(还没被读取就被新帧覆盖)和重复帧(同一帧被读取了多次)
+    * 可以保留最近几帧的历史，用于按时间戳和其他摄像头配对
+    * 设置了缓冲池时，每一帧记录交给消费者还没有归还的次数，
+      移出历史并且所有读取都 `release_frame` 之后才归还到缓冲池
+    """
+
+    def __init__(
+        self,
+        _id: int|None = None,
+        w: int = 320,
+        h: int = 240,
+        fps: int = 60,
+        pool: FramePool|None = None,
+        raw: bool = False,
+        decode_mode: str = "bgr",
+        history: int = 1
+    ) -> None:
+        """
+        初始化
+        ----
+        Args:
+            history (int): 保留的历史帧数(包括最新帧)，其余参数同 `Cap`
+        """
+        super().__init__(_id, w, h, fps, pool, raw, decode_mode)
+        self.frame_id:int = 0  # 最新帧的编号，从1开始
+        self.timestamp:float = 0.0  # 最新帧的采集时间戳(time.perf_counter)
+        self.dropped_frames:int = 0  # 没有被读取就被覆盖的帧数
+        self.duplicate_frames:int = 0  # 重复读取同一帧的次数
+        self.history = max(1, history)
+
+        self._frame = None
+        self._read_id = 0  # 上一次被读取的帧编号
+        # 历史帧，每一项为 [帧编号, 时间戳, 帧, 交给消费者还没有归还的次数, 延迟追踪]
+        self._history:deque[list] = deque()
+        # 移出历史时还有消费者在使用的帧，{id(帧): [帧, 没有归还的次数]}
+        self._outstanding:dict[int, list] = {}
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # 切换配置的时候暂停抓帧
+        self._generation = 0  # 配置的版本号，切换配置之后丢弃按旧配置采集的帧
+        self._running = True
+        self._thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self._thread.start()
+
+    def _grab_loop(self):
+        """
+        抓帧线程
+        ----
+        """
+        while self._running:
+            with self._io_lock:
+                ret, frame, trace = self._capture()
+                generation = self._generation
+            if not ret:
+                time.sleep(0.005)
+                continue
+            timestamp = time.perf_counter()
+            with self._cond:
+                if generation != self._generation:
+                    # 抓帧之后切换了配置，按旧配置采集的帧不能交出去
+                    if self.pool is not None:
+                        self.pool.release(frame)
+                    continue
+                # 上一帧没有被读取过，直接被覆盖了
+                if self._frame is not None and self.frame_id > self._read_id:
+                    self.dropped_frames += 1
+                self._frame = frame
+                self.frame_id += 1
+                self.timestamp = timestamp
+                self._history.append([self.frame_id, timestamp, frame, 0, trace])
+                while len(self._history) > self.history:
+                    self._evict(self._history.popleft())
+                self._cond.notify_all()
+
+    def _evict(self, entry: list):
+        """
+        帧移出历史，没有消费者在使用时归还到缓冲池，需要持有 `_cond`
+        """
+        _, _, old, count, _ = entry
+        if self.pool is None:
+            return
+        if count == 0:
+            self.pool.release(old)
+        else:
+            # 消费者还在使用，等全部归还之后再放回缓冲池
+            self._outstanding[id(old)] = [old, count]
+
+    def read_stamped(self, wait_new: bool = False, timeout: float = 1.0):
+        """
+        读取最新帧和帧信息
+        ----
+        Args:
+            wait_new (bool): 是否等待一帧没有读取过的新帧
+            timeout (float): 等待的超时时间(s)
+        Returns:
+            tuple: (ret, frame, frame_id, timestamp)
+        """
+        with self._cond:
+            if self._frame is None or wait_new:
+                self._cond.wait_for(
+                    lambda: (self._frame is not None and self.frame_id > self._read_id) or not self._running,
+                    timeout
+                )
+            if self._frame is None:
+                return False, None, 0, 0.0
+
+            if self.frame_id == self._read_id:
+                self.duplicate_frames += 1
+            self._read_id = self.frame_id
+            self._history[-1][3] += 1
+            self._hand_out_trace(self._history[-1])
+            return True, self._frame, self.frame_id, self.timestamp
+
+    def read_nearest(self, timestamp: float, timeout: float = 0.0):
+        """
+        读取历史中采集时间最接近timestamp的一帧
+        ----
+        最新帧还早于timestamp时，最多等待timeout秒让更新的帧到达
+
+        Args:
+            timestamp (float): 目标时间戳(time.perf_counter)
+            timeout (float): 等待的超时时间(s)
+        Returns:
+            tuple: (ret, frame, frame_id, timestamp)
+        """
+        with self._cond:
+            if timeout > 0:
+                self._cond.wait_for(
+                    lambda: self.timestamp >= timestamp or not self._running,
+                    timeout
+                )
+            if not self._history:
+                return False, None, 0, 0.0
+            entry = min(self._history, key=lambda item: abs(item[1] - timestamp))
+            entry[3] += 1
+            self._hand_out_trace(entry)
+            return True, entry[2], entry[0], entry[1]
+
+    def _hand_out_trace(self, entry: list):
+        """
+        帧交给消费者时记录读取时间，同一帧可能被读取多次，每次读取单独计时
+        """
+        trace = entry[4].copy()
+        trace.stamp("read")
+        self.last_trace = trace
+
+    def read(self, image: cv2.typing.MatLike | None = None):
+        """
+        读取最新帧
+        ----
+        Returns:
+            tuple: (ret, frame)
+        """
+        ret, frame, _, _ = self.read_stamped()
+        return ret, frame
+
+    def release_frame(self, frame: cv2.typing.MatLike | None):
+        if self.pool is None or frame is None:
+            return
+        with self._cond:
+            # 还在历史中的帧可能会被再次读取，只减少计数，移出历史的时候再归还
+            for entry in self._history:
+                if entry[2] is frame:
+                    entry[3] = max(0, entry[3] - 1)
+                    return
+            item = self._outstanding.get(id(frame))
+            if item is None or item[0] is not frame:
+                # 不是交出去的帧或者已经归还过，忽略
+                return
+            item[1] -= 1
+            if item[1] <= 0:
+                del self._outstanding[id(frame)]
+                self.pool.release(frame)
+
+    def _read_new(self):
+        # 最新帧可能已经读过，预热时需要等待新帧
+        ret, frame, _, _ = self.read_stamped(wait_new=True, timeout=0.5)
+        return ret, frame
+
+    def apply_profile(self, profile: dict | None) -> bool:
+        """
+        切换采集配置
+        ----
+        配置有变化时清空按旧配置采集的历史帧，已经抓到但还没放进历史的旧帧由抓帧线程按版本号丢弃，
+        再等待一帧按新配置采集的帧，保证之后读到的帧都是新配置
+        """
+        with self._io_lock:
+            changed = super().apply_profile(profile)
+            if changed:
+                with self._cond:
+                    self._generation += 1
+                    while self._history:
+                        self._evict(self._history.popleft())
+                    self._frame = None
+        if changed:
+            self.skip(1)
+        return changed
+
+    def skip(self, n: int, timeout: float = 1.0) -> int:
+        """
+        等待调用之后采集到的n帧新帧
+        ----
+        抓帧线程本身只保留最新帧，这里用于丢弃调用之前采集到的旧画面
+
+        Args:
+            n (int): 需要等待的新帧数
+            timeout (float): 超时时间(s)
+        Returns:
+            int: 实际等到的新帧数
+        """
+        with self._cond:
+            start = self.frame_id
+            self._cond.wait_for(
+                lambda: self.frame_id - start >= n or not self._running,
+                timeout
+            )
+            return min(n, self.frame_id - start)
+
+    def release(self):
+        if self._running:
+            self._running = False
+            with self._cond:
+                self._cond.notify_all()
+            if threading.current_thread() is not self._thread:
+                self._thread.join(timeout=1.0)
+        super().release()
+
+
+class MultiCap:
+    """
+    多节点同步采集
+    ----
+    * 每个video节点一个后台抓帧线程，并行读取，互不影响帧率
+    * 以第一个节点为基准，其余节点取采集时间最接近的一帧配对，作为一次同步读取
+    * 例如一个低分辨率预览流加一个高分辨率识别流
+    """
+
+    def __init__(
+        self,
+        ids: list[int] | None = None,
+        sizes: list[tuple[int, int, int]] | None = None,
+        max_skew: float = 0.010,
+        history: int = 4,
+        pool: FramePool | None = None,
+    ) -> None:
+        """
+        初始化
+        ----
+        Args:
+            ids (list[int]): video节点编号，默认使用 `Cap.getCaptureIndexes` 找到的所有采集节点
+            sizes (list[tuple]): 每个节点的(宽, 高, 帧率)，默认都是320x240@60
+            max_skew (float): 配对的两帧允许的最大时间差(s)
+            history (int): 每个节点保留的历史帧数
+            pool (FramePool): 帧缓冲池，所有节点共用
+        """
+        if ids is None:
+            ids = Cap.getCaptureIndexes()
+        if sizes is None:
+            sizes = [(320, 240, 60)] * len(ids)
+        if len(sizes) != len(ids):
+            raise ValueError("argument sizes must have the same length as ids")
+
+        self.caps = [
+            ThreadedCap(_id, w, h, fps, pool, history=history)
+            for _id, (w, h, fps) in zip(ids, sizes)
+        ]
+        self.max_skew = max_skew
+        self.unpaired_frames:int = 0  # 因为时间差太大没能配对的次数
+
+    @property
+    def NEED2CUT(self):
+        return self.caps[0].NEED2CUT
+
+    @NEED2CUT.setter
+    def NEED2CUT(self, value: int):
+        for cap in self.caps:
+            cap.NEED2CUT = value
+
+    def read_stamped(self, wait_new: bool = False, timeout: float = 1.0):
+        """
+        同步读取所有节点
+        ----
+        Args:
+            wait_new (bool): 基准节点是否等待一帧没有读取过的新帧
+            timeout (float): 等待的超时时间(s)
+        Returns:
+            tuple: (ret, frames, timestamps)，frames和timestamps按节点顺序排列
+        """
+        ret, ref, _, ref_ts = self.caps[0].read_stamped(wait_new, timeout)
+        if not ret:
+            return False, None, None
+
+        frames = [ref]
+        timestamps = [ref_ts]
+        for cap in self.caps[1:]:
+            ok, frame, _, ts = cap.read_nearest(ref_ts, self.max_skew)
+            if ok:
+                frames.append(frame)
+            if not ok or abs(ts - ref_ts) > self.max_skew:
+                self.unpaired_frames += 1
+                # 没能配对，已经交出来的帧要还给各自的节点
+                self.release_frame(frames)
+                return False, None, None
+            timestamps.append(ts)
+        return True, frames, timestamps
+
+    def read(self):
+        """
+        同步读取所有节点
+        ----
+        Returns:
+            tuple: (ret, frames)
+        """
+        ret, frames, _ = self.read_stamped()
+        return ret, frames
+
+    def release_frame(self, frames: list | None):
+        if frames is None:
+            return
+        for cap, frame in zip(self.caps, frames):
+            cap.release_frame(frame)
+
+    @property
+    def frame_transform(self) -> tuple[int, int, int]:
+        return self.caps[0].frame_transform
+
+    @property
+    def last_trace(self) -> Trace | None:
+        """基准节点上一次读取的帧的延迟追踪"""
+        return self.caps[0].last_trace
+
+    def apply_profile(self, profile: dict | None) -> bool:
+        """切换基准节点的采集配置"""
+        return self.caps[0].apply_profile(profile)
+
+    def warm_up(self, timeout: float = 3.0, **kwargs) -> tuple[bool, float, int]:
+        """
+        依次等待所有节点预热完成，所有节点共用超时时间
+        ----
+        Returns:
+            tuple: (是否全部收敛, 用时(s), 读取的总帧数)
+        """
+        start = time.perf_counter()
+        converged, frames = True, 0
+        for cap in self.caps:
+            remain = max(0.0, timeout - (time.perf_counter() - start))
+            ok, _, n = cap.warm_up(remain, **kwargs)
+            converged = converged and ok
+            frames += n
+        return converged, time.perf_counter() - start, frames
+
+    def skip(self, n: int, timeout: float = 1.0) -> int:
+        return self.caps[0].skip(n, timeout)
+
+    def release(self):
+        for cap in self.caps:
+            cap.release()
+
+
+class ReplayCap:
+    """
+    回放采集源
+    ----
+    从视频文件或者图片文件夹中读取帧，接口与 `Cap` 相同，用于离线复现问题和测试耗时
+
+    节奏模式:
+    * "fast": 尽快读取，每次 `read` 返回下一帧
+    * "realtime": 按录制的帧率实时播放，读取得慢的时候和真实摄像头一样会丢帧
+    * "step": 锁步，只有调用 `step` 才前进一帧，`read` 一直返回当前帧
+    """
+
+    # 识别的时候需要裁剪掉的底部区域高度(px)
+    NEED2CUT:int = 40
+    # 每N帧处理一帧，fast模式下生效
+    process_every:int = 1
+
+    IMG_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+    PACING_MODES = ("fast", "realtime", "step")
+
+    @property
+    def DETECT_HEIGHT(self):
+        """
+        裁剪的时候需要保留的高度
+        """
+        res = self.height - self.NEED2CUT
+        return res if res > 0 else self.height
+
+    def __init__(self, source: str, pacing: str = "fast", fps: float | None = None, loop: bool = False) -> None:
+        """
+        初始化
+        ----
+        Args:
+            source (str): 视频文件路径或者图片文件夹路径，文件夹中的图片按文件名排序
+            pacing (str): 节奏模式，包括'fast'、'realtime'和'step'
+            fps (float): 回放帧率，默认使用视频的帧率，图片文件夹默认30
+            loop (bool): 播放完之后是否从头开始
+        """
+        if pacing not in self.PACING_MODES:
+            raise ValueError("argument pacing must is fast, realtime or step")
+        self.source = source
+        self.pacing = pacing
+        self.loop = loop
+        # 裁剪矩形 [[x0, y0], [x1, y1]]，None时只裁掉底部NEED2CUT
+        self.crop: list | None = None
+
+        self._files: list[str] = []
+        self._video: cv2.VideoCapture | None = None
+        if os.path.isdir(source):
+            self._files = sorted(
+                os.path.join(source, name) for name in os.listdir(source)
+                if name.lower().endswith(self.IMG_SUFFIXES)
+            )
+            self.frame_count = len(self._files)
+            self.fps = fps or 30
+        else:
+            self._video = cv2.VideoCapture(source)
+            if not self._video.isOpened():
+                raise FileNotFoundError(f"无法打开回放文件 {source}")
+            self.frame_count = int(self._video.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = fps or self._video.get(cv2.CAP_PROP_FPS) or 30
+        if self.frame_count <= 0:
+            raise ValueError(f"回放源 {source} 中没有帧")
+
+        self.frame_index:int = -1  # 上一次read返回的帧序号
+        self.finished:bool = False  # 是否已经播放完
+        self._frame = None
+        self._frame_pos = -1  # _frame缓存的帧序号
+        self._video_pos = 0  # 视频下一次read得到的帧序号
+        self._step_target = 0  # step模式下的目标帧序号
+        self._start: float | None = None  # realtime模式下第0帧的播放时刻
+        self.last_trace: Trace | None = None  # 上一次read得到的帧的延迟追踪
+
+        # 读出第一帧，获取宽高，第一次read直接使用
+        first = self._load(0)
+        if first is None:
+            raise ValueError(f"回放源 {source} 读取失败")
+        self.height, self.width = first.shape[:2]
+
+    def _load(self, index: int):
+        """
+        读取指定序号的帧
+        ----
+        视频只能往后读，跳过的帧只grab不解码。
+        返回缓存帧的拷贝，调用者在返回的帧上画图不会改到缓存
+        """
+        if self._video is None:
+            frame = cv2.imread(self._files[index])
+        else:
+            if index < self._video_pos:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, index)
+                self._video_pos = index
+            while self._video_pos < index:
+                self._video.grab()
+                self._video_pos += 1
+            ret, frame = self._video.read()
+            self._video_pos += 1
+            if not ret:
+                frame = None
+        self._frame_pos = index
+        self._frame = frame
+        return None if frame is None else frame.copy()
+
+    def _target_index(self) -> int:
+        """
+        根据节奏模式计算这一次read应该返回的帧序号
+        """
+        if self.pacing == "step":
+            return self._step_target
+        if self.pacing == "fast":
+            return self.frame_index + (self.process_every if self.frame_index >= 0 else 1)
+
+        # realtime: 阻塞到下一帧的播放时刻，读得慢时跳到当前时刻对应的帧
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now - max(self.frame_index, 0) / self.fps
+        target = max(self.frame_index + 1, int((now - self._start) * self.fps))
+        delay = self._start + target / self.fps - now
+        if delay > 0:
+            time.sleep(delay)
+        return target
+
+    def read(self, image: cv2.typing.MatLike | None = None):
+        """
+        读取回放帧
+        ----
+        Returns:
+            tuple: (ret, frame)
+        """
+        target = self._target_index()
+        if target >= self.frame_count:
+            if not self.loop:
+                self.finished = True
+                return False, None
+            target = 0
+            self._step_target = 0
+            self._start = None
+
+        trace = Trace()
+        trace.stamp("grab")
+        if target == self._frame_pos and self._frame is not None:
+            # 缓存的帧会被重复返回，同样拷贝一份，避免消费者在缓存的帧上画图
+            frame = self._frame.copy()
+        else:
+            frame = self._load(target)
+        trace.stamp("decoded")
+        self.frame_index = target
+        if frame is None:
+            return False, None
+        trace.stamp("read")
+        self.last_trace = trace
+        return True, crop_frame(frame, self.crop, self.DETECT_HEIGHT)
+
+    @property
+    def frame_transform(self) -> tuple[int, int, int]:
+        """
+        读出的图像坐标到录像画面坐标的变换 (x0, y0, scale)
+        """
+        if self.crop is None:
+            return 0, 0, 1
+        return self.crop[0][0], self.crop[0][1], 1
+
+    def apply_profile(self, profile: dict | None) -> bool:
+        """
+        切换采集配置
+        ----
+        录像的分辨率和帧率是固定的，只使用裁剪矩形
+        """
+        if not profile:
+            return False
+        crop = profile.get("crop")
+        changed = crop != self.crop
+        self.crop = crop
+        return changed
+
+    def step(self, n: int = 1):
+        """
+        step模式下前进n帧
+        ----
+        Args:
+            n (int): 前进的帧数
+        """
+        self._step_target = self.frame_index + n
+
+    def skip(self, n: int, timeout: float = 1.0) -> int:
+        """
+        跳过n帧，跳过的帧不解码
+        ----
+        Returns:
+            int: 实际跳过的帧数
+        """
+        n = min(n, self.frame_count - 1 - self.frame_index)
+        if n <= 0:
+            return 0
+        if self._video is not None:
+            while self._video_pos < self.frame_index + 1 + n:
+                self._video.grab()
+                self._video_pos += 1
+        self.frame_index += n
+        self._step_target = max(self._step_target, self.frame_index)
+        self._frame = None
+        self._frame_pos = -1
+        return n
+
+    def warm_up(self, timeout: float = 3.0, **kwargs) -> tuple[bool, float, int]:
+        """回放不需要等待曝光收敛"""
+        return True, 0.0, 0
+
+    def release_frame(self, frame: cv2.typing.MatLike | None):
+        """回放源没有缓冲池，接口与Cap保持一致"""
+        pass
+
+    def release(self):
+        if self._video is not None:
+            self._video.release()
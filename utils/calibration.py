@@ -0,0 +1,437 @@
+"""
+Copyright (C) 2025 IVEN-CN(He Yunfeng) and Anan-yy(Weng Kaiyi)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+镜头标定
+====
+广角镜头的畸变校正和地面坐标换算
+
+* 用棋盘格标定相机内参和畸变系数
+* `initUndistortRectifyMap` 的映射表只计算一次，以.npy保存在配置文件旁边，之后用mmap直接加载
+* 整帧校正只需要一次 `remap`；只需要校正识别到的点时查表即可，不需要整帧校正
+* 用地面上的参考点计算单应性，预先计算像素到地面坐标(mm)的查找表
+
+缓存文件名中带有标定参数的哈希，标定参数改变之后会自动重新计算
+"""
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+
+class LensCalibration:
+    """
+    镜头畸变校正
+    ----
+    * `remap_frame`: 整帧校正
+    * `undistort_point` / `undistort_points`: 只校正点，查表得到校正之后的坐标
+
+    坐标都是完整采集画面中的坐标，裁剪之后的图像需要先换算到完整画面
+    """
+
+    def __init__(
+        self,
+        camera_matrix,
+        dist_coeffs,
+        image_size: tuple[int, int],
+        alpha: float = 0.0,
+        cache_dir: str = "."
+    ):
+        """
+        初始化
+        ----
+        Args:
+            camera_matrix (list): 相机内参矩阵 3x3
+            dist_coeffs (list): 畸变系数
+            image_size (tuple): 标定时的画面大小 (w, h)
+            alpha (float): 校正之后保留原画面的比例，0时裁掉所有黑边，1时保留所有像素
+            cache_dir (str): 映射表的缓存目录，一般为配置文件所在目录
+        """
+        self.camera_matrix = np.asarray(camera_matrix, np.float64).reshape(3, 3)
+        self.dist_coeffs = np.asarray(dist_coeffs, np.float64).reshape(-1)
+        self.image_size = (int(image_size[0]), int(image_size[1]))
+        self.alpha = float(alpha)
+        self.cache_dir = cache_dir
+        self.new_camera_matrix, _ = cv2.getOptimalNewCameraMatrix(
+            self.camera_matrix, self.dist_coeffs, self.image_size, self.alpha
+        )
+        self._map1: np.ndarray | None = None
+        self._map2: np.ndarray | None = None
+        self._point_lut: np.ndarray | None = None
+        # 裁剪之后的图像使用平移过的映射表，{(x0, y0, h, w): (map1, map2)}
+        self._shifted_maps: dict[tuple, tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def from_config(cls, config: dict | None, cache_dir: str = ".") -> "LensCalibration | None":
+        """
+        从配置创建
+        ----
+        Args:
+            config (dict): 配置中的calibration项
+            cache_dir (str): 映射表的缓存目录
+        Returns:
+            LensCalibration|None: 没有标定参数时返回None
+        """
+        if not config or config.get("camera_matrix") is None or config.get("dist_coeffs") is None:
+            return None
+        return cls(
+            config["camera_matrix"],
+            config["dist_coeffs"],
+            config.get("image_size", (320, 240)),
+            config.get("alpha", 0.0),
+            cache_dir,
+        )
+
+    @property
+    def key(self) -> str:
+        """
+        标定参数的哈希，用于缓存文件名
+        """
+        h = hashlib.sha1()
+        for arr in (self.camera_matrix, self.dist_coeffs, np.array(self.image_size, np.float64), np.array([self.alpha])):
+            h.update(np.round(arr, 8).tobytes())
+        return h.hexdigest()[:10]
+
+    def _cache_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"undistort_{self.key}_{name}.npy")
+
+    def _load_or_build(self, name: str, build) -> np.ndarray:
+        """
+        读取缓存的表，没有缓存时计算并保存
+        """
+        path = self._cache_path(name)
+        if os.path.exists(path):
+            try:
+                return np.load(path, mmap_mode="r")
+            except (OSError, ValueError):
+                pass
+        table = build()
+        try:
+            np.save(path, table)
+        except OSError:
+            # 缓存目录不可写，只在内存中使用
+            return table
+        return np.load(path, mmap_mode="r")
+
+    def _build_maps(self):
+        map1, map2 = cv2.initUndistortRectifyMap(
+            self.camera_matrix, self.dist_coeffs, None,
+            self.new_camera_matrix, self.image_size, cv2.CV_16SC2
+        )
+        return map1, map2
+
+    @property
+    def maps(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        整帧校正的映射表 (map1, map2)，CV_16SC2格式
+        """
+        if self._map1 is None or self._map2 is None:
+            maps = None
+
+            def build(index):
+                nonlocal maps
+                if maps is None:
+                    maps = self._build_maps()
+                return maps[index]
+
+            self._map1 = self._load_or_build("map1", lambda: build(0))
+            self._map2 = self._load_or_build("map2", lambda: build(1))
+        return self._map1, self._map2
+
+    @property
+    def point_lut(self) -> np.ndarray:
+        """
+        点校正的查找表，float32 (h, w, 2)，lut[y, x]为原画面中(x, y)校正之后的坐标
+        """
+        if self._point_lut is None:
+            def build():
+                w, h = self.image_size
+                xs, ys = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
+                pts = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+                res = cv2.undistortPoints(pts, self.camera_matrix, self.dist_coeffs, P=self.new_camera_matrix)
+                return res.reshape(h, w, 2).astype(np.float32)
+            self._point_lut = self._load_or_build("points", build)
+        return self._point_lut
+
+    def preload(self) -> np.ndarray:
+        """
+        加载或生成点校正的查找表，避免第一次识别时才计算
+        ----
+        Returns:
+            np.ndarray: 点校正的查找表
+        """
+        return self.point_lut
+
+    def remap_frame(
+        self,
+        frame: cv2.typing.MatLike,
+        offset: tuple[int, int] = (0, 0),
+        dst: cv2.typing.MatLike | None = None
+    ) -> cv2.typing.MatLike:
+        """
+        整帧校正
+        ----
+        Args:
+            frame (cv2.typing.MatLike): 图像，可以是完整画面中从offset开始裁剪出来的一部分
+            offset (tuple): 图像左上角在完整画面中的坐标
+            dst (cv2.typing.MatLike): 输出数组，形状匹配时直接写入
+        Returns:
+            cv2.typing.MatLike: 校正之后的图像，坐标系和输入图像相同
+        """
+        h, w = frame.shape[:2]
+        x0, y0 = int(offset[0]), int(offset[1])
+        key = (x0, y0, h, w)
+        if key not in self._shifted_maps:
+            map1, map2 = self.maps
+            sub1 = np.array(map1[y0:y0 + h, x0:x0 + w], np.int16)
+            sub2 = np.array(map2[y0:y0 + h, x0:x0 + w], np.uint16)
+            if (x0, y0) != (0, 0):
+                sub1 -= np.array([x0, y0], np.int16)
+            self._shifted_maps[key] = (sub1, sub2)
+        map1, map2 = self._shifted_maps[key]
+        if map1.shape[:2] != (h, w):
+            raise ValueError(f"图像 {frame.shape} 超出了标定画面 {self.image_size}")
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, dst=dst)
+
+    def undistort_point(self, point) -> tuple[int, int]:
+        """
+        校正一个点
+        ----
+        Args:
+            point (tuple): 完整画面中的坐标
+        Returns:
+            tuple: 校正之后的坐标
+        """
+        w, h = self.image_size
+        x = min(max(int(round(point[0])), 0), w - 1)
+        y = min(max(int(round(point[1])), 0), h - 1)
+        u, v = self.point_lut[y, x]
+        return int(round(float(u))), int(round(float(v)))
+
+    def undistort_points(self, points) -> np.ndarray:
+        """
+        校正多个点
+        ----
+        Args:
+            points (array-like): 完整画面中的坐标，形状为(N, 2)
+        Returns:
+            np.ndarray: 校正之后的坐标，float32 (N, 2)
+        """
+        pts = np.asarray(points, np.float32).reshape(-1, 2)
+        w, h = self.image_size
+        xs = np.clip(np.rint(pts[:, 0]).astype(np.int32), 0, w - 1)
+        ys = np.clip(np.rint(pts[:, 1]).astype(np.int32), 0, h - 1)
+        return np.asarray(self.point_lut[ys, xs])
+
+    def clear_cache(self):
+        """
+        删除磁盘上的映射表缓存
+        """
+        self._map1 = self._map2 = self._point_lut = None
+        self._shifted_maps.clear()
+        for name in ("map1", "map2", "points"):
+            path = self._cache_path(name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def calibrate_chessboard(
+        images: list[cv2.typing.MatLike],
+        pattern: tuple[int, int] = (9, 6),
+        square: float = 1.0
+    ) -> tuple[np.ndarray, np.ndarray, float] | None:
+        """
+        棋盘格标定
+        ----
+        Args:
+            images (list): 不同角度拍摄的棋盘格图像
+            pattern (tuple): 棋盘格内角点数 (列, 行)
+            square (float): 棋盘格边长
+        Returns:
+            tuple|None: (相机内参矩阵, 畸变系数, 重投影误差)，有效图像不足3张时返回None
+        """
+        objp = np.zeros((pattern[0] * pattern[1], 3), np.float32)
+        objp[:, :2] = np.mgrid[0:pattern[0], 0:pattern[1]].T.reshape(-1, 2) * square
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+
+        obj_points, img_points = [], []
+        size = None
+        for img in images:
+            gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            size = gray.shape[::-1]
+            found, corners = cv2.findChessboardCorners(gray, pattern, None)
+            if not found:
+                continue
+            corners = cv2.cornerSubPix(gray, corners, (5, 5), (-1, -1), criteria)
+            obj_points.append(objp)
+            img_points.append(corners)
+
+        if len(obj_points) < 3 or size is None:
+            return None
+        rms, camera_matrix, dist_coeffs, _, _ = cv2.calibrateCamera(obj_points, img_points, size, None, None)
+        return camera_matrix, dist_coeffs.reshape(-1), rms
+
+
+class GroundPlane:
+    """
+    地面坐标换算
+    ----
+    * 用标定时点击的参考点(至少4个)和它们在地面上的坐标(mm)计算单应性矩阵
+    * 预先计算整个画面的像素到地面坐标的查找表，每个点的换算只需要一次查表
+    * 标定过镜头时，参考点和查找表都先做畸变校正，单应性在校正之后的画面上计算
+
+    查找表和镜头的映射表一样以.npy缓存在配置文件旁边
+    """
+
+    def __init__(
+        self,
+        pixel_points,
+        world_points,
+        image_size: tuple[int, int],
+        lens: LensCalibration | None = None,
+        cache_dir: str = "."
+    ):
+        """
+        初始化
+        ----
+        Args:
+            pixel_points (list): 参考点在完整画面中的像素坐标，形状为(N, 2)
+            world_points (list): 参考点在地面上的坐标(mm)，形状为(N, 2)
+            image_size (tuple): 画面大小 (w, h)
+            lens (LensCalibration): 镜头畸变校正，None时不校正，画面大小要和image_size相同
+            cache_dir (str): 查找表的缓存目录
+        """
+        if lens is not None and lens.image_size != tuple(int(v) for v in image_size):
+            # 单应性在校正之后的画面上计算，画面大小不同时查找表里是没有校正的像素，换算结果会是错的
+            raise ValueError(f"地面标定的画面 {tuple(image_size)} 和镜头标定的画面 {lens.image_size} 大小不同")
+        self.pixel_points = np.asarray(pixel_points, np.float64).reshape(-1, 2)
+        self.world_points = np.asarray(world_points, np.float64).reshape(-1, 2)
+        if len(self.pixel_points) < 4 or len(self.pixel_points) != len(self.world_points):
+            raise ValueError("地面标定至少需要4对参考点，并且像素坐标和地面坐标一一对应")
+        self.image_size = (int(image_size[0]), int(image_size[1]))
+        self.lens = lens
+        self.cache_dir = cache_dir
+
+        src = self.pixel_points if lens is None else lens.undistort_points(self.pixel_points).astype(np.float64)
+        self.homography, _ = cv2.findHomography(src, self.world_points)
+        if self.homography is None:
+            raise ValueError("参考点退化，无法计算单应性矩阵")
+        self._lut: np.ndarray | None = None
+
+    @classmethod
+    def from_config(
+        cls,
+        config: dict | None,
+        lens: LensCalibration | None = None,
+        cache_dir: str = "."
+    ) -> "GroundPlane | None":
+        """
+        从配置创建
+        ----
+        Args:
+            config (dict): 配置中的ground_plane项
+            lens (LensCalibration): 镜头畸变校正
+            cache_dir (str): 查找表的缓存目录
+        Returns:
+            GroundPlane|None: 没有标定时返回None
+        """
+        if not config or not config.get("pixel_points") or not config.get("world_points"):
+            return None
+        return cls(
+            config["pixel_points"],
+            config["world_points"],
+            config.get("image_size", (320, 240)),
+            lens,
+            cache_dir,
+        )
+
+    @property
+    def key(self) -> str:
+        """
+        标定参数的哈希，用于缓存文件名
+        """
+        h = hashlib.sha1()
+        for arr in (self.homography, np.array(self.image_size, np.float64)):
+            h.update(np.round(arr, 8).tobytes())
+        if self.lens is not None:
+            h.update(self.lens.key.encode())
+        return h.hexdigest()[:10]
+
+    @property
+    def lut(self) -> np.ndarray:
+        """
+        像素到地面坐标的查找表，float32 (h, w, 2)，lut[y, x]为完整画面中(x, y)对应的地面坐标(mm)
+        """
+        if self._lut is None:
+            path = os.path.join(self.cache_dir, f"ground_{self.key}.npy")
+            if os.path.exists(path):
+                try:
+                    self._lut = np.load(path, mmap_mode="r")
+                    return self._lut
+                except (OSError, ValueError):
+                    pass
+            w, h = self.image_size
+            if self.lens is not None:
+                pts = np.asarray(self.lens.point_lut, np.float32).reshape(-1, 1, 2)
+            else:
+                xs, ys = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
+                pts = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+            lut = cv2.perspectiveTransform(pts, self.homography).reshape(h, w, 2).astype(np.float32)
+            try:
+                np.save(path, lut)
+                self._lut = np.load(path, mmap_mode="r")
+            except OSError:
+                self._lut = lut
+        return self._lut
+
+    def build_lut(self) -> np.ndarray:
+        """
+        加载或生成像素到地面坐标的查找表，避免第一次识别时才计算
+        ----
+        Returns:
+            np.ndarray: 像素到地面坐标的查找表
+        """
+        return self.lut
+
+    def to_world(self, point) -> tuple[float, float]:
+        """
+        像素坐标换算到地面坐标
+        ----
+        Args:
+            point (tuple): 完整画面中的像素坐标
+        Returns:
+            tuple: 地面坐标(mm)
+        """
+        w, h = self.image_size
+        x = min(max(int(round(point[0])), 0), w - 1)
+        y = min(max(int(round(point[1])), 0), h - 1)
+        X, Y = self.lut[y, x]
+        return float(X), float(Y)
+
+    def to_world_points(self, points) -> np.ndarray:
+        """
+        多个像素坐标换算到地面坐标
+        ----
+        Args:
+            points (array-like): 完整画面中的像素坐标，形状为(N, 2)
+        Returns:
+            np.ndarray: 地面坐标(mm)，float32 (N, 2)
+        """
+        pts = np.asarray(points, np.float32).reshape(-1, 2)
+        w, h = self.image_size
+        xs = np.clip(np.rint(pts[:, 0]).astype(np.int32), 0, w - 1)
+        ys = np.clip(np.rint(pts[:, 1]).astype(np.int32), 0, h - 1)
+        return np.asarray(self.lut[ys, xs])
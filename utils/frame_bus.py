@@ -0,0 +1,420 @@
+"""
+Copyright (C) 2025 IVEN-CN(He Yunfeng) and Anan-yy(Weng Kaiyi)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+共享内存帧总线
+====
+采集进程把帧写进共享内存中的环形缓冲，识别、图传和录像进程各自读取，互不阻塞
+
+* 帧直接解码进共享内存，读取端拿到的是共享内存上的视图，不拷贝也不序列化
+* 每一帧有递增的序号，读取端通过序号判断是否有新帧，以及读到的帧是否已经被覆盖
+* 环形缓冲有 `slots` 个槽位，读到的帧在之后 `slots - 1` 帧之内保持有效
+
+内存布局
+- 总头: int64[4]，(最新序号, 槽位数, 每个槽位的字节数, 保留)
+- 槽位头: float64[slots, 6]，(序号, 取帧时间, 解码完成时间, 高, 宽, 通道数)，写入中的槽位序号为-1
+- 槽位数据: slots * 每个槽位的字节数
+"""
+import time
+from multiprocessing import shared_memory, resource_tracker
+
+import cv2
+import numpy as np
+
+from ._cap import Cap, crop_frame
+from .trace import Trace
+
+BUS_NAME = "eic_frame_bus"
+
+_HEADER_BYTES = 32
+_META_FIELDS = 6
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    连接已经存在的共享内存
+    ----
+    读取端不负责回收共享内存，不能注册到resource_tracker，否则读取进程退出时会把共享内存删掉
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class _FrameBus:
+    """
+    帧总线的共享内存视图
+    ----
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, slot_bytes: int):
+        self.shm = shm
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.header = np.ndarray((4,), np.int64, shm.buf, 0)
+        self.meta = np.ndarray((slots, _META_FIELDS), np.float64, shm.buf, _HEADER_BYTES)
+        # 数据区按64字节对齐
+        self.data_offset = (_HEADER_BYTES + self.meta.nbytes + 63) // 64 * 64
+
+    def slot_view(self, slot: int, shape: tuple) -> np.ndarray:
+        """
+        槽位数据上指定形状的视图
+        """
+        return np.ndarray(shape, np.uint8, self.shm.buf, self.data_offset + slot * self.slot_bytes)
+
+    def close(self):
+        # 先删掉引用共享内存的数组，否则close会报BufferError
+        self.header = self.meta = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # 还有读取端持有的帧视图，等进程退出时释放
+            pass
+
+
+class FrameBusWriter(_FrameBus):
+    """
+    帧总线写入端
+    ----
+    由采集进程持有，负责创建和删除共享内存
+    """
+
+    def __init__(self, name: str = BUS_NAME, width: int = 640, height: int = 480, channels: int = 3, slots: int = 8):
+        """
+        初始化
+        ----
+        Args:
+            name (str): 共享内存名称
+            width (int): 最大宽度
+            height (int): 最大高度
+            channels (int): 最大通道数
+            slots (int): 环形缓冲的槽位数
+        """
+        slot_bytes = (width * height * channels + 63) // 64 * 64
+        size = 64 + slots * _META_FIELDS * 8 + slots * slot_bytes + 64
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 上一次异常退出残留的共享内存
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        super().__init__(shm, slots, slot_bytes)
+        self.header[:] = (0, slots, slot_bytes, 0)
+        self.meta[:, 0] = 0
+        self.seq = 0
+        self._slot: int | None = None
+
+    def begin(self, shape: tuple) -> np.ndarray:
+        """
+        取出下一个槽位用于写入
+        ----
+        槽位序号先标记为-1，读取端不会读到写了一半的帧
+
+        Args:
+            shape (tuple): 帧的形状
+        Returns:
+            np.ndarray: 槽位上的视图，可以直接作为 `Cap.read` 的解码目标
+        """
+        if int(np.prod(shape)) > self.slot_bytes:
+            raise ValueError(f"帧 {shape} 超过了帧总线槽位的大小 {self.slot_bytes}")
+        self._slot = (self.seq + 1) % self.slots
+        self.meta[self._slot, 0] = -1
+        return self.slot_view(self._slot, shape)
+
+    def publish(self, frame: np.ndarray, grab_ts: float = 0.0, decoded_ts: float = 0.0) -> int:
+        """
+        发布一帧
+        ----
+        frame已经写在 `begin` 取出的槽位上时不拷贝，否则拷贝进槽位
+
+        Args:
+            frame (np.ndarray): 帧
+            grab_ts (float): 取帧时间(time.perf_counter)
+            decoded_ts (float): 解码完成时间(time.perf_counter)
+        Returns:
+            int: 帧序号
+        """
+        shape = frame.shape if frame.ndim == 3 else (*frame.shape, 1)
+        if self._slot is None:
+            self.begin(shape)
+        slot = self._slot
+        view = self.slot_view(slot, shape)
+        if not np.may_share_memory(frame, view):
+            np.copyto(view, frame.reshape(shape))
+
+        self.seq += 1
+        # 先写完槽位头，最后更新序号
+        self.meta[slot, 1:] = (grab_ts, decoded_ts or grab_ts, *shape)
+        self.meta[slot, 0] = self.seq
+        self.header[0] = self.seq
+        self._slot = None
+        return self.seq
+
+    def close(self):
+        shm = self.shm
+        super().close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameBusReader(_FrameBus):
+    """
+    帧总线读取端
+    ----
+    * 接口和 `Cap` 一致，可以直接作为 `MainSystem` 的采集源
+    * `read` 返回共享内存上的视图，在之后 `slots - 1` 帧之内有效，需要保留更久的话自行拷贝，
+      或者处理完之后用 `valid` 检查有没有被覆盖
+    * 采集配置中只有裁剪在读取端生效
+    """
+    NEED2CUT = 0
+    process_every = 1
+
+    @property
+    def DETECT_HEIGHT(self):
+        """
+        裁剪的时候需要保留的高度
+        """
+        res = self.height - self.NEED2CUT
+        return res if res > 0 else self.height
+
+    def __init__(self, name: str = BUS_NAME, timeout: float = 5.0):
+        """
+        初始化
+        ----
+        Args:
+            name (str): 共享内存名称
+            timeout (float): 等待采集进程创建帧总线的超时时间(s)
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                shm = _attach(name)
+                break
+            except FileNotFoundError:
+                if time.perf_counter() > deadline:
+                    raise
+                time.sleep(0.05)
+        header = np.ndarray((4,), np.int64, shm.buf, 0)
+        slots, slot_bytes = int(header[1]), int(header[2])
+        del header
+        super().__init__(shm, slots, slot_bytes)
+        self.height = 0
+        self.width = 0
+        # 裁剪矩形 [[x0, y0], [x1, y1]]，None时只裁掉底部NEED2CUT
+        self.crop: list | None = None
+        self.last_seq = 0  # 上一次读取的帧序号
+        self.last_trace: Trace | None = None  # 上一次read得到的帧的延迟追踪
+
+    def _wait(self, seq: int, timeout: float) -> bool:
+        """
+        等待序号大于seq的帧
+        """
+        deadline = time.perf_counter() + timeout
+        while self.header[0] <= seq:
+            if time.perf_counter() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def read_stamped(self, wait_new: bool = True, timeout: float = 1.0):
+        """
+        读取最新帧和帧信息
+        ----
+        Args:
+            wait_new (bool): 是否等待一帧没有读取过的新帧
+            timeout (float): 等待的超时时间(s)
+        Returns:
+            tuple: (ret, frame, seq, timestamp)
+        """
+        if not self._wait(self.last_seq if wait_new else 0, timeout):
+            return False, None, 0, 0.0
+        for _ in range(self.slots):
+            seq = int(self.header[0])
+            slot = seq % self.slots
+            meta = self.meta[slot].copy()
+            # 读槽位头的时候槽位已经开始被覆盖，重新取最新序号
+            if int(meta[0]) != seq:
+                continue
+            _, grab_ts, decoded_ts, h, w, c = meta
+            shape = (int(h), int(w)) if int(c) == 1 else (int(h), int(w), int(c))
+            frame = self.slot_view(slot, shape)
+            # 视图直接指向共享内存，设为只读，防止识别时改写正在发布的帧
+            frame.setflags(write=False)
+            self.height, self.width = shape[:2]
+            self.last_seq = seq
+
+            trace = Trace()
+            trace.stamp("grab", grab_ts)
+            trace.stamp("decoded", decoded_ts)
+            trace.stamp("read")
+            self.last_trace = trace
+            return True, frame, seq, grab_ts
+        return False, None, 0, 0.0
+
+    def read(self, image: cv2.typing.MatLike | None = None):
+        """
+        读取最新帧
+        ----
+        Args:
+            image (cv2.typing.MatLike): 传入时把帧拷贝进去，不传时返回共享内存上的只读视图，
+                用完之后需要用 `valid` 检查帧是否已经被覆盖
+        Returns:
+            tuple: (ret, frame)
+        """
+        ret, frame, _, _ = self.read_stamped()
+        if not ret:
+            return False, None
+        frame = crop_frame(frame, self.crop, self.DETECT_HEIGHT)
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def valid(self, seq: int | None = None) -> bool:
+        """
+        检查读到的帧是否还没有被覆盖
+        ----
+        Args:
+            seq (int): 帧序号，默认为上一次读取的帧
+        """
+        seq = self.last_seq if seq is None else seq
+        return seq > 0 and int(self.meta[seq % self.slots, 0]) == seq
+
+    @property
+    def frame_transform(self) -> tuple[int, int, int]:
+        """
+        输出帧坐标到完整画面坐标的变换 (x0, y0, scale)
+        """
+        if self.crop is None:
+            return 0, 0, 1
+        return self.crop[0][0], self.crop[0][1], 1
+
+    def apply_profile(self, profile: dict | None) -> bool:
+        """
+        切换采集配置，只有裁剪生效
+        """
+        if not profile:
+            return False
+        crop = profile.get("crop")
+        changed = crop != self.crop
+        self.crop = crop
+        return changed
+
+    def skip(self, n: int, timeout: float = 1.0) -> int:
+        """
+        等待调用之后发布的n帧新帧
+        ----
+        Returns:
+            int: 实际等到的新帧数
+        """
+        start = int(self.header[0])
+        self._wait(start + n - 1, timeout)
+        got = min(int(self.header[0]) - start, n)
+        self.last_seq = int(self.header[0])
+        return got
+
+    def warm_up(self, timeout: float = 3.0, **kwargs) -> tuple[bool, float, int]:
+        """
+        等待帧总线上的第一帧，摄像头的预热在采集进程中完成
+        ----
+        Returns:
+            tuple: (是否有帧, 用时(s), 0)
+        """
+        start = time.perf_counter()
+        ok = self._wait(0, timeout)
+        return ok, time.perf_counter() - start, 0
+
+    def release_frame(self, frame: cv2.typing.MatLike | None):
+        """帧在共享内存上，不需要归还"""
+        return
+
+    def release(self):
+        self.close()
+
+
+def run_capture(name: str, stop_event, cap_kwargs: dict | None = None, slots: int = 8):
+    """
+    采集进程
+    ----
+    打开摄像头，把每一帧直接解码进帧总线
+
+    Args:
+        name (str): 共享内存名称
+        stop_event (multiprocessing.Event): 停止信号
+        cap_kwargs (dict): 传给 `Cap` 的参数
+        slots (int): 环形缓冲的槽位数
+    """
+    cap_kwargs = cap_kwargs or {}
+    cap = Cap(**cap_kwargs)
+    # 发布完整画面，裁剪由各个读取端自己做
+    cap.NEED2CUT = 0
+    # 摄像头不支持设置的分辨率时按实际分辨率分配槽位
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or cap.width
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or cap.height
+    writer = FrameBusWriter(name, width, height, 3, slots)
+    shape = (height, width, 3)
+    # 曝光收敛之后再发布，读取端不会拿到预热中的画面
+    cap.warm_up()
+    try:
+        while not stop_event.is_set():
+            view = writer.begin(cap._frame_shape or shape)
+            ret, frame = cap.read(view)
+            if not ret:
+                time.sleep(0.005)
+                continue
+            trace = cap.last_trace
+            writer.publish(frame, trace.stamps.get("grab", 0.0), trace.stamps.get("decoded", 0.0))
+    finally:
+        cap.release()
+        writer.close()
+
+
+def run_recorder(name: str, path: str, stop_event, fps: float = 30):
+    """
+    录像进程
+    ----
+    把帧总线上的帧写进MJPG视频，录下来的视频可以用 `ReplayCap` 回放
+
+    Args:
+        name (str): 共享内存名称
+        path (str): 视频保存路径
+        stop_event (multiprocessing.Event): 停止信号
+        fps (float): 视频帧率
+    """
+    reader = FrameBusReader(name)
+    writer = None
+    try:
+        while not stop_event.is_set():
+            ret, frame, _, _ = reader.read_stamped(timeout=0.5)
+            if not ret:
+                continue
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc("M", "J", "P", "G"), fps, (w, h))
+            writer.write(frame)
+            del frame
+    finally:
+        if writer is not None:
+            writer.release()
+        reader.release()
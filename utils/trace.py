@@ -0,0 +1,157 @@
+"""
+Copyright (C) 2025 IVEN-CN(He Yunfeng) and Anan-yy(Weng Kaiyi)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+延迟追踪
+====
+记录一帧从采集到串口发送结果的各个时间点，用于分析延迟花在哪一步
+
+时间点(均为time.perf_counter)
+- grab: 摄像头取到帧
+- decoded: 解码完成
+- read: 帧交给识别
+- detect_start / detect_end: 识别开始和结束
+- uart_start / uart_end: 串口发送开始和write返回(Uart.flush_on_trace打开时为数据发送完成)
+"""
+import functools
+import time
+from collections import deque
+
+
+class Trace:
+    """
+    一帧的延迟追踪
+    ----
+    由Cap在读取时创建，随识别传递，串口发送结果时结束
+    """
+
+    # 各阶段耗时，(阶段名, 开始时间点, 结束时间点)
+    STAGES = (
+        ("decode", "grab", "decoded"),
+        ("capture_age", "decoded", "read"),
+        ("detect", "detect_start", "detect_end"),
+        ("uart", "uart_start", "uart_end"),
+        ("total", "grab", "uart_end"),
+    )
+
+    def __init__(self, recorder: "TraceRecorder|None" = None):
+        self.stamps:dict[str, float] = {}
+        self.recorder = recorder
+        self.finished = False
+
+    def stamp(self, name: str, t: float|None = None, once: bool = False):
+        """
+        记录时间点
+        ----
+        Args:
+            name (str): 时间点名称
+            t (float): 时间，默认为当前时间
+            once (bool): 已经记录过时不覆盖，用于嵌套调用只记录最外层的开始时间
+        """
+        if once and name in self.stamps:
+            return
+        self.stamps[name] = time.perf_counter() if t is None else t
+
+    def copy(self) -> "Trace":
+        """
+        复制追踪，同一帧被多次读取时每次读取单独计时
+        """
+        trace = Trace(self.recorder)
+        trace.stamps = dict(self.stamps)
+        return trace
+
+    def breakdown(self) -> dict[str, float]:
+        """
+        各阶段耗时
+        ----
+        缺少时间点的阶段不出现在结果中
+
+        Returns:
+            dict: {阶段名: 耗时(ms)}
+        """
+        res = {}
+        for stage, start, end in self.STAGES:
+            if start in self.stamps and end in self.stamps:
+                res[stage] = (self.stamps[end] - self.stamps[start]) * 1000
+        return res
+
+    def finish(self):
+        """
+        结束追踪，交给记录器统计，重复调用只统计一次
+        """
+        if self.finished:
+            return
+        self.finished = True
+        if self.recorder is not None:
+            self.recorder.add(self)
+
+    def __str__(self) -> str:
+        return "  ".join(f"{k}:{v:.2f}ms" for k, v in self.breakdown().items())
+
+
+class TraceRecorder:
+    """
+    延迟统计
+    ----
+    保留最近若干帧的追踪，计算各阶段的平均和最大耗时
+    """
+
+    def __init__(self, maxlen: int = 100):
+        self.traces:deque[Trace] = deque(maxlen=maxlen)
+
+    def add(self, trace: Trace):
+        self.traces.append(trace)
+
+    @property
+    def last(self) -> Trace|None:
+        return self.traces[-1] if self.traces else None
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        各阶段耗时统计
+        ----
+        Returns:
+            dict: {阶段名: {"mean": 平均耗时(ms), "max": 最大耗时(ms), "count": 帧数}}
+        """
+        values:dict[str, list[float]] = {}
+        for trace in self.traces:
+            for stage, ms in trace.breakdown().items():
+                values.setdefault(stage, []).append(ms)
+        return {
+            stage: {"mean": sum(v) / len(v), "max": max(v), "count": len(v)}
+            for stage, v in values.items()
+        }
+
+    def clear(self):
+        self.traces.clear()
+
+
+def traced(func):
+    """
+    识别方法的装饰器
+    ----
+    对象的 `trace` 不为None时记录识别的开始和结束时间
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        trace:Trace|None = getattr(self, "trace", None)
+        if trace is None:
+            return func(self, *args, **kwargs)
+        trace.stamp("detect_start", once=True)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            trace.stamp("detect_end")
+    return wrapper